@@ -0,0 +1,105 @@
+"""
+Micro-benchmark for per-page profile extraction.
+
+Compares the old approach (serialize the DOM, re-parse it with html.parser)
+against extraction.py: the fast HTML parser used on the HTTP path and, with
+--browser, a single execute_script round trip in a real headless Chrome.
+
+    python benchmarks/bench_extract.py [--deals 40] [--filler 2000] [--repeat 20] [--browser]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from extraction import (HTML_PARSER, parse_html, parse_profile_fields, profile_fields_from_driver,  # noqa: E402
+                        deals_from_driver)
+
+
+def synthetic_profile(deals: int, filler: int) -> str:
+    """A profile page shaped like traded.co's MUI markup, padded with unrelated nodes."""
+    deal_rows = "".join(
+        f'<li><a class="MuiTypography-root MuiTypography-bBase" href="/deals/{i}-bridge-loan">'
+        f'Arranged ${i + 1}M bridge loan for a multifamily acquisition in Austin, TX</a></li>'
+        for i in range(deals))
+    noise = "".join(f'<div class="MuiBox-root css-{i}"><span>Filler item {i}</span><img src="/i/{i}.png"></div>'
+                    for i in range(filler))
+    return f"""<html><head><title>Jane Broker</title></head><body>
+<h1>Jane Broker</h1><p>Managing Director at</p>
+<span aria-label="Jane's position in Acme Capital">Managing Director at <strong>Acme Capital</strong></span>
+<a href="mailto:jane@acme.example?subject=hi">Email</a>
+<button><div aria-label="phone icon"></div>(555) 010-0000</button>
+<ul>{deal_rows}</ul>
+<nav><button aria-label="Go to page 2">2</button></nav>
+<section>{noise}</section>
+</body></html>"""
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def report(label: str, ms: float, baseline: float):
+    print(f"  {label:<46} {ms:9.2f} ms   x{baseline / ms if ms else float('inf'):.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--deals", type=int, default=40)
+    parser.add_argument("--filler", type=int, default=2000, help="unrelated DOM nodes to pad the page with")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--browser", action="store_true", help="also time page_source vs execute_script in Chrome")
+    args = parser.parse_args()
+
+    html = synthetic_profile(args.deals, args.filler)
+    print(f"Synthetic profile: {len(html) / 1024:.0f} KiB, {args.deals} deals, {args.filler} filler nodes")
+
+    def before():
+        return parse_profile_fields(BeautifulSoup(html, "html.parser"))
+
+    def after_html():
+        return parse_profile_fields(parse_html(html))
+
+    assert len(before()["deals"]) == len(after_html()["deals"]) == args.deals
+
+    baseline = timed(before, args.repeat)
+    print("Per-page parse time (median):")
+    report("before: html.parser full re-parse", baseline, baseline)
+    report(f"after (HTTP path): {HTML_PARSER}", timed(after_html, args.repeat), baseline)
+
+    if not args.browser:
+        return
+
+    from scraper import get_chrome_driver
+
+    with tempfile.NamedTemporaryFile("w", suffix=".html", delete=False) as f:
+        f.write(html)
+    driver = get_chrome_driver()
+    try:
+        driver.get(f"file://{f.name}")
+        browser_before = timed(lambda: parse_profile_fields(BeautifulSoup(driver.page_source, "html.parser")),
+                               args.repeat)
+        print("In-browser extraction (median, includes the WebDriver round trip):")
+        report("before: page_source + html.parser", browser_before, browser_before)
+        report("after: execute_script(PROFILE_JS)", timed(lambda: profile_fields_from_driver(driver), args.repeat),
+               browser_before)
+        report("after: execute_script(DEALS_JS)", timed(lambda: deals_from_driver(driver, 2), args.repeat),
+               browser_before)
+    finally:
+        driver.quit()
+        os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
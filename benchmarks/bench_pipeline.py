@@ -0,0 +1,152 @@
+"""
+Offline end-to-end benchmark of the scraping pipeline.
+
+Runs collect_broker_links, load_all_deals, analyze_broker and
+extract_broker_metadata against FakeDriver and the HTML fixtures (no network,
+no Chrome, pacing delays off, profile cache and deal store off) and reports
+throughput plus per-phase latency from the metrics timers. With --baseline
+it exits non-zero when a stage's throughput drops by more than --tolerance,
+so parse/classify/pipeline regressions fail CI.
+
+    python benchmarks/bench_pipeline.py [--repeat 5] [--http] [--deal-source dom|embedded] [--json out.json]
+                                        [--baseline base.json --tolerance 0.25]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def configure_environment(early_exit: str, deal_source: str):
+    """Delays off and no state shared with real runs; must happen before the scraper modules are imported."""
+    for endpoint in ("LISTING", "PROFILE", "DEALS_PAGE", "HTTP"):
+        os.environ[f"PACE_{endpoint}_SECONDS"] = "0"
+    os.environ["PROFILE_CACHE"] = "0"
+    os.environ["DEAL_STORE"] = "0"
+    os.environ["EARLY_EXIT"] = early_exit
+    os.environ["LINKEDIN_TIMEOUT"] = "0"
+    os.environ["DEAL_SOURCE"] = deal_source
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def run_stage(name: str, items, fn, repeat: int):
+    """Call fn(item) for every item, `repeat` times; returns the stage report and the last run's stats."""
+    import metrics
+
+    runs, latencies, stats = [], [], None
+    for _ in range(repeat):
+        with metrics.track_run() as stats:
+            start = time.perf_counter()
+            for item in items:
+                item_start = time.perf_counter()
+                fn(item)
+                latencies.append(time.perf_counter() - item_start)
+            runs.append(time.perf_counter() - start)
+    seconds = statistics.median(runs)
+    return {
+        "items": len(items),
+        "seconds": round(seconds, 4),
+        "per_second": round(len(items) / seconds, 2) if seconds else float("inf"),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "phases": stats.timing_summary(),
+        "counters": stats.summary(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--http", action="store_true", help="serve profiles through the HTTP fast path as well")
+    parser.add_argument("--early-exit", default="bound", choices=("off", "bound", "confidence"))
+    parser.add_argument("--deal-source", default="dom", choices=("dom", "embedded"),
+                        help="read deal lists by clicking through deal pages or from the hydration JSON")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="report from an earlier run to compare throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed throughput drop vs the baseline")
+    args = parser.parse_args()
+
+    configure_environment(args.early_exit, args.deal_source)
+    # Deferred so the environment above is what the modules read at import time.
+    import http_fetch
+    from discovery import collect_broker_links, extract_broker_metadata
+    from fake_driver import FakeDriver, FixtureAdapter, Fixtures
+    from scraper import MAX_PAGES_PER_BROKER, analyze_broker, load_all_deals
+
+    fixtures = Fixtures()
+    driver = FakeDriver(fixtures)
+    if args.http:
+        http_fetch.HTTP_FAST_PATH = True
+        fetcher = http_fetch.HttpFetcher(driver)
+        fetcher.session.mount("https://", FixtureAdapter(fixtures))
+        http_fetch._fetchers[driver] = fetcher
+
+    profiles = list(fixtures.profiles)
+    brokers = [{"profile_url": url, "name": url.rstrip("/").rsplit("/", 1)[-1], "company": "Unknown"}
+               for url in profiles]
+    qualified = []
+
+    def open_and_load_deals(url):
+        driver.get(url)
+        load_all_deals(driver, max_pages=MAX_PAGES_PER_BROKER)
+
+    def analyze(broker):
+        qualified.append(analyze_broker(driver, broker)[0])
+
+    # Output from the scraper itself is noise here; only the report goes to stdout.
+    real_stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        report = {
+            # Stop at the last populated listing page: the empty page after it costs
+            # a fixed 10 s wait for "Profile" links, which would swamp everything else.
+            "collect_broker_links": run_stage(
+                "collect_broker_links", fixtures.states,
+                lambda state: collect_broker_links(driver, [state], fixtures.listing_pages), args.repeat),
+            "load_all_deals": run_stage("load_all_deals", profiles, open_and_load_deals, args.repeat),
+            "analyze_broker": run_stage("analyze_broker", brokers, analyze, args.repeat),
+            "extract_broker_metadata": run_stage(
+                "extract_broker_metadata", profiles, lambda url: extract_broker_metadata(driver, url), args.repeat),
+        }
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+    print(f"Offline pipeline benchmark: {len(fixtures.listing)} listing pages, {len(profiles)} profiles, "
+          f"repeat {args.repeat}, HTTP fast path {'on' if args.http else 'off'}, early exit {args.early_exit}, "
+          f"deal source {args.deal_source}")
+    print(f"  {qualified.count(True) // args.repeat}/{len(brokers)} brokers qualified")
+    print(f"  {'stage':<26}{'items':>7}{'items/s':>11}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, stage in report.items():
+        print(f"  {name:<26}{stage['items']:>7}{stage['per_second']:>11.1f}{stage['p50_ms']:>10.2f}"
+              f"{stage['p95_ms']:>10.2f}")
+        for phase, timing in stage["phases"].items():
+            print(f"      {phase:<22} {timing['count']:>5} calls  avg {timing['avg_seconds'] * 1000:8.2f} ms"
+                  f"  max {timing['max_seconds'] * 1000:8.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = [name for name, stage in report.items() if name in baseline
+                       and stage["per_second"] < baseline[name]["per_second"] * (1 - args.tolerance)]
+        for name in regressions:
+            print(f"REGRESSION: {name} {report[name]['per_second']:.1f} items/s "
+                  f"vs baseline {baseline[name]['per_second']:.1f}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
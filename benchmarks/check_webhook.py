@@ -0,0 +1,116 @@
+"""
+Offline check of webhook delivery against a local stand-in for the n8n webhook.
+
+Starts an HTTP server on 127.0.0.1 and points a WebhookDeliverer at it (no
+real endpoint is contacted), then checks that batches are delivered per
+state, that batches the endpoint rejects are spooled and re-sent once it
+recovers, that an unreadable spool file is moved aside and that a spool
+directory that cannot be written does not stop the delivery thread. Exits
+non-zero when a check fails.
+
+    python benchmarks/check_webhook.py
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webhook import WebhookDeliverer  # noqa: E402
+
+
+class StandIn:
+    """The webhook endpoint: records every batch it accepts and answers `status`."""
+
+    def __init__(self):
+        self.status = 200
+        self.batches = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if stand_in.status == 200:
+                    stand_in.batches.append(payload)
+                self.send_response(stand_in.status)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/webhook"
+
+    def delivered(self, state: str) -> int:
+        return sum(batch["count"] for batch in self.batches if batch["state"] == state)
+
+
+def rows(count: int, state: str):
+    return [{"Name": f"Broker {i}", "Location": state} for i in range(count)]
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+def main():
+    stand_in = StandIn()
+    failures = []
+
+    def check(name: str, ok: bool):
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+        if not ok:
+            failures.append(name)
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        deliverer = WebhookDeliverer(url=stand_in.url, timeout=2, batch_size=10, flush_seconds=0.2, max_retries=2,
+                                     backoff=0.01, spool_dir=spool_dir)
+        print(f"Webhook delivery against a stand-in at {stand_in.url}")
+
+        deliverer.enqueue(rows(25, "Texas"), "Texas")
+        deliverer.enqueue(rows(3, "Ohio"), "Ohio")
+        deliverer.flush(timeout=5)
+        check("batches are delivered per state", stand_in.delivered("Texas") == 25 and stand_in.delivered("Ohio") == 3)
+        check("batches are capped at batch_size", max(batch["count"] for batch in stand_in.batches) == 10)
+
+        stand_in.status = 500
+        deliverer.enqueue(rows(4, "Utah"), "Utah")
+        deliverer.flush(timeout=5)
+        check("a rejected batch is spooled", deliverer.spooled_count() == 1 and stand_in.delivered("Utah") == 0)
+        stand_in.status = 200
+        check("spooled batches are re-sent once the endpoint recovers",
+              wait_for(lambda: stand_in.delivered("Utah") == 4 and deliverer.spooled_count() == 0))
+
+        with open(os.path.join(spool_dir, "0-corrupt.json"), "w") as f:
+            f.write("{not json")
+        check("an unreadable spool file is moved aside",
+              wait_for(lambda: os.path.exists(os.path.join(spool_dir, "0-corrupt.json.bad"))))
+
+        deliverer.spool_dir = os.path.join(spool_dir, "0-corrupt.json.bad", "spool")  # Under a file: cannot be created.
+        stand_in.status = 500
+        deliverer.enqueue(rows(2, "Iowa"), "Iowa")
+        deliverer.flush(timeout=5)
+        deliverer.spool_dir = spool_dir
+        stand_in.status = 200
+        deliverer.enqueue(rows(5, "Maine"), "Maine")
+        deliverer.flush(timeout=5)
+        check("delivery goes on after a spool write fails", stand_in.delivered("Maine") == 5)
+        deliverer.close(timeout=5)
+
+    stand_in.server.shutdown()
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
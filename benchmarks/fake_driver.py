@@ -0,0 +1,268 @@
+"""
+An offline stand-in for the logged-in Chrome driver, backed by the HTML
+fixtures in benchmarks/fixtures (see make_fixtures.py).
+
+It implements the slice of the WebDriver API the scraper uses: get,
+current_url, title, page_source, get_cookies, find_element(s) with XPath and
+simple attribute CSS selectors, and execute_script for the snippets in
+extraction.py, evaluated with the BeautifulSoup parsers they mirror. Clicking
+a "Go to page N" button swaps in that deal page; clicking the About heading
+reveals the LinkedIn panel. FixtureAdapter serves the same pages to the HTTP
+fast path's requests.Session.
+"""
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import lxml.html
+import requests
+from requests.adapters import BaseAdapter
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from extraction import (DEALS_JS, EMBEDDED_DATA_JS, HYDRATION_JS, LINKEDIN_SELECTOR, PROFILE_JS, PROFILE_LINKS_JS,
+                        has_deal_page, parse_deal_links, parse_html, parse_profile_fields)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+_ABOUT_PANEL = re.compile(r"<div data-about-panel>.*?</div>", re.DOTALL)
+_CSS_ATTRIBUTE = re.compile(r'\[([\w-]+)([*^$]?=)"([^"]*)"\]')
+_NOT_FOUND = "<html><head><title>Page not found</title></head><body><h2>404</h2></body></html>"
+
+
+class Fixtures:
+    """manifest.json plus lazily read fixture pages."""
+
+    def __init__(self, directory: str = FIXTURES_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+        self.states: List[str] = manifest["states"]
+        self.listing_pages: int = manifest["listing_pages"]
+        self.listing: Dict[str, str] = manifest["listing"]
+        self.profiles: Dict[str, List[str]] = manifest["profiles"]
+        self._pages: Dict[str, str] = {}
+
+    def read(self, filename: str) -> str:
+        page = self._pages.get(filename)
+        if page is None:
+            with open(os.path.join(self.directory, filename)) as f:
+                page = self._pages[filename] = f.read()
+        return page
+
+    def page(self, url: str, deal_page: int = 1) -> Optional[str]:
+        if url in self.listing:
+            return self.read(self.listing[url])
+        files = self.profiles.get(url)
+        if files and 1 <= deal_page <= len(files):
+            return self.read(files[deal_page - 1])
+        return None
+
+
+def css_to_xpath(selector: str) -> str:
+    """tag[attr="v"][attr*="v"][attr^="v"] selectors, which is all the scraper hands to By.CSS_SELECTOR."""
+    match = re.fullmatch(r'([\w*]*)((?:\[[^\]]+\])*)', selector.strip())
+    if not match:
+        raise NotImplementedError(f"FakeDriver cannot evaluate CSS selector {selector!r}")
+    conditions = []
+    for attr, op, value in _CSS_ATTRIBUTE.findall(match.group(2)):
+        if op == "=":
+            conditions.append(f'@{attr}="{value}"')
+        elif op == "*=":
+            conditions.append(f'contains(@{attr}, "{value}")')
+        elif op == "^=":
+            conditions.append(f'starts-with(@{attr}, "{value}")')
+        else:
+            conditions.append(f'substring(@{attr}, string-length(@{attr}) - {len(value) - 1}) = "{value}"')
+    return f"//{match.group(1) or '*'}" + "".join(f"[{c}]" for c in conditions)
+
+
+class FakeElement:
+    def __init__(self, driver: "FakeDriver", element):
+        self._driver = driver
+        self._element = element
+
+    @property
+    def text(self) -> str:
+        return " ".join(self._element.text_content().split())
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        return self._element.get(name)
+
+    def is_displayed(self) -> bool:
+        return True
+
+    def is_enabled(self) -> bool:
+        return True
+
+    def click(self):
+        self._driver.click(self)
+
+
+class FakeDriver:
+    """Serves fixture pages in place of a logged-in traded.co Chrome session."""
+
+    lean = True
+
+    def __init__(self, fixtures: Optional[Fixtures] = None):
+        self.fixtures = fixtures or Fixtures()
+        self.current_url = "about:blank"
+        self._html = "<html><head><title></title></head><body></body></html>"
+        self._about = ""
+        self._deal_page = 1
+        self._soup = None
+        self._tree = None
+        self.navigations = 0
+
+    # Document state -------------------------------------------------------
+
+    def _render(self, html: str):
+        about = _ABOUT_PANEL.search(html)
+        self._about = about.group(0) if about else ""
+        self._set_html(_ABOUT_PANEL.sub("", html, count=1))
+
+    def _set_html(self, html: str):
+        self._html, self._soup, self._tree = html, None, None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = parse_html(self._html)
+        return self._soup
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = lxml.html.document_fromstring(self._html)
+        return self._tree
+
+    @property
+    def page_source(self) -> str:
+        return self._html
+
+    @property
+    def title(self) -> str:
+        title = self.tree.find(".//title")
+        return (title.text or "") if title is not None else ""
+
+    def get(self, url: str):
+        self.navigations += 1
+        self.current_url = url
+        self._deal_page = 1
+        self._render(self.fixtures.page(url) or _NOT_FOUND)
+
+    def get_cookies(self) -> List[Dict[str, Any]]:
+        return [{"name": "session", "value": "offline", "domain": "traded.co", "path": "/"}]
+
+    def add_cookie(self, cookie: Dict[str, Any]):
+        pass
+
+    def delete_all_cookies(self):
+        pass
+
+    def refresh(self):
+        self.get(self.current_url)
+
+    # Elements -------------------------------------------------------------
+
+    def find_elements(self, by: str = By.ID, value: Optional[str] = None) -> List[FakeElement]:
+        if by == By.XPATH:
+            xpath = value
+        elif by == By.CSS_SELECTOR:
+            xpath = css_to_xpath(value)
+        elif by == By.TAG_NAME:
+            xpath = f"//{value}"
+        elif by == By.NAME:
+            xpath = f'//*[@name="{value}"]'
+        elif by == By.ID:
+            xpath = f'//*[@id="{value}"]'
+        else:
+            raise NotImplementedError(f"FakeDriver cannot locate elements by {by}")
+        return [FakeElement(self, element) for element in self.tree.xpath(xpath)]
+
+    def find_element(self, by: str = By.ID, value: Optional[str] = None) -> FakeElement:
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"No element matches {by}={value!r}")
+        return elements[0]
+
+    def click(self, element: FakeElement):
+        label = element.get_attribute("aria-label") or ""
+        page = re.fullmatch(r"Go to page (\d+)", label)
+        if page:
+            html = self.fixtures.page(self.current_url, int(page.group(1)))
+            if html is not None:
+                self._deal_page = int(page.group(1))
+                self._render(html)
+        elif element.text.lower() == "about" and self._about:
+            self._set_html(self._html.replace("</body>", self._about + "</body>", 1))
+            self._about = ""
+
+    # Scripts --------------------------------------------------------------
+
+    def execute_script(self, script: str, *args):
+        if script == DEALS_JS:
+            return {"deals": parse_deal_links(self.soup), "has_next_page": has_deal_page(self.soup, args[1])}
+        if script == PROFILE_JS:
+            fields = parse_profile_fields(self.soup)
+            fields["has_next_page"] = has_deal_page(self.soup, args[1])
+            # PROFILE_JS only reads the rendered link; the embedded data is read separately (EMBEDDED_DATA_JS).
+            link = self.soup.select_one(LINKEDIN_SELECTOR)
+            fields["linkedin"] = link.get("href") if link else None
+            return fields
+        if script == EMBEDDED_DATA_JS:
+            return [element.string for element in self.soup.select(args[0])]
+        if script == HYDRATION_JS:
+            element = self.soup.select_one(args[0])
+            return element.string if element is not None else None
+        if script == PROFILE_LINKS_JS:
+            return [a.get("href") for a in self.soup.find_all("a", string="Profile")
+                    if (a.get("href") or "").startswith("/agent/")]
+        if "document.readyState" in script:
+            return "complete"
+        if "performance.getEntriesByType('navigation')" in script:
+            return None
+        if "navigator.userAgent" in script:
+            return "Mozilla/5.0 (offline benchmark)"
+        if "window.localStorage" in script:
+            return {} if script.lstrip().startswith("return") else None
+        if "scrollIntoView" in script:
+            return None
+        if script.strip() == "arguments[0].click();":
+            args[0].click()
+            return None
+        if "window.location.href" in script:
+            self.get(args[0])
+            return None
+        raise NotImplementedError(f"FakeDriver cannot run script: {script.strip()[:60]!r}")
+
+    def get_log(self, log_type: str) -> List[Dict[str, Any]]:
+        return []  # No network traffic to log offline.
+
+    def execute_cdp_cmd(self, cmd: str, params: Dict[str, Any]):
+        return {}
+
+    def quit(self):
+        pass
+
+
+class FixtureAdapter(BaseAdapter):
+    """A requests transport answering traded.co URLs from the fixtures, for the HTTP fast path."""
+
+    def __init__(self, fixtures: Fixtures):
+        super().__init__()
+        self.fixtures = fixtures
+
+    def send(self, request, **kwargs):
+        html = self.fixtures.page(request.url)
+        response = requests.Response()
+        response.status_code = 200 if html is not None else 404
+        response._content = (html or _NOT_FOUND).encode()
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,152 @@
+"""
+Write the offline HTML fixtures used by bench_pipeline.py.
+
+Pages follow traded.co's MUI markup as the extraction selectors see it:
+agent listing pages with "Profile" links, and broker profiles with a header,
+contact block, a paginated deal list ("Go to page N" buttons) and an About
+panel. The embedded __NEXT_DATA__ payload carries the full deal list; the
+LinkedIn link sits in the About panel, only in that payload, or nowhere, as
+on the live site. Output is deterministic for a given seed.
+A captured page can replace any fixture as long as manifest.json points at it.
+
+    python benchmarks/make_fixtures.py [--out benchmarks/fixtures] [--seed 7]
+"""
+import argparse
+import json
+import os
+import random
+
+STATES = ["Texas", "Ohio"]
+LISTING_PAGES = 2
+PROFILES_PER_PAGE = 4
+DEALS_PER_PAGE = 10
+FILLER_NODES = 120
+
+FIRST_NAMES = ["Jane", "Omar", "Priya", "Luis", "Mei", "Noah", "Ava", "Samir", "Grace", "Tomas", "Ivy", "Dmitri"]
+LAST_NAMES = ["Broker", "Haddad", "Raman", "Ortega", "Chen", "Fischer", "Kowalski", "Nasser", "Lindqvist", "Moreau"]
+COMPANIES = ["Acme Capital", "Northbridge Lending", "Harbor Point Finance", "Summit CRE Advisors", "Keystone Debt"]
+TITLES = ["Managing Director", "Vice President", "Senior Director", "Principal"]
+GOOD_DEALS = ["bridge loan for a multifamily acquisition", "construction financing for a mixed-use development",
+              "mezzanine financing for a value-add repositioning", "refinance of a transitional office asset",
+              "rehab loan for a lease-up industrial portfolio"]
+BAD_DEALS = ["fixed-rate agency loan for a stabilized apartment", "permanent conduit financing for retail",
+             "HUD 223(f) loan for senior housing", "Fannie Mae DUS loan for a garden community",
+             "life company takeout for a medical office"]
+GOOD_LOAN_TYPES = ["Bridge", "Construction", "Mezzanine"]
+BAD_LOAN_TYPES = ["Agency", "Permanent", "CMBS"]
+CITIES = ["Austin, TX", "Dallas, TX", "Columbus, OH", "Cleveland, OH", "Houston, TX", "Cincinnati, OH"]
+
+PAGE = """<!DOCTYPE html><html><head><title>{title}</title><meta charset="utf-8">{head}</head><body>
+<header class="MuiAppBar-root"><nav><a href="/">traded</a><a href="/deals/">Deals</a><a href="/agents/">Agents</a></nav></header>
+<main class="MuiContainer-root">{main}</main>
+<footer>{filler}</footer>
+</body></html>
+"""
+
+
+def filler(rng: random.Random) -> str:
+    return "".join(f'<div class="MuiBox-root css-{rng.randrange(10 ** 6):x}"><span>Related listing {i}</span>'
+                   f'<img src="/img/{i}.webp" alt=""></div>' for i in range(FILLER_NODES))
+
+
+def slug(name: str, index: int) -> str:
+    return f"{name.lower().replace(' ', '-')}-{index}"
+
+
+def listing_page(state: str, page: int, agents, rng: random.Random) -> str:
+    cards = "".join(
+        f'<div class="MuiCard-root"><h3>{name}</h3><p>{company}</p>'
+        f'<a class="MuiButton-root" href="/agent/{agent_slug}/">Profile</a></div>'
+        for name, company, agent_slug in agents)
+    main = f"<h1>Top {state} Loan Brokers</h1><p>Page {page}</p><section>{cards}</section>"
+    return PAGE.format(title=f"{state} loan brokers | traded", head="", main=main, filler=filler(rng))
+
+
+def profile_page(broker, page: int, pages: int, deals, all_deals, rng: random.Random) -> str:
+    name, title, company, agent_slug = broker["name"], broker["title"], broker["company"], broker["slug"]
+    deal_rows = "".join(
+        f'<li><a class="MuiTypography-root MuiTypography-bBase" href="/deals/{deal_slug}/">{text}</a></li>'
+        for deal_slug, text, _ in deals)
+    buttons = "".join(f'<button aria-label="Go to page {n}">{n}</button>' for n in range(1, pages + 1) if n != page)
+    linkedin_url = f"https://www.linkedin.com/in/{agent_slug}"
+    linkedin = (f'<a href="{linkedin_url}" aria-label="{name}\'s LinkedIn profile">LinkedIn</a>'
+                if broker["linkedin"] == "panel" else "")
+    # The hydration state carries the broker's whole deal list, not just the rendered page.
+    agent = {"slug": agent_slug, "name": name}
+    if broker["linkedin"] == "embedded":
+        agent["linkedinUrl"] = linkedin_url
+    data = {"props": {"pageProps": {"agent": agent, "deals": [
+        {"slug": deal_slug, "title": text, "loanType": loan_type} for deal_slug, text, loan_type in all_deals]}}}
+    head = f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script>'
+    main = f"""<h1>{name}</h1><p>{title} at</p>
+<span aria-label="{name}'s position in {company}">{title} at <strong>{company}</strong></span>
+<a href="mailto:{agent_slug}@example.com?subject=traded">Email</a>
+<button><div aria-label="phone icon"></div>(555) {rng.randrange(100, 999)}-{rng.randrange(1000, 9999)}</button>
+<h2>About</h2>
+<div data-about-panel><p>{name} arranges debt for commercial real estate.</p>{linkedin}</div>
+<h2>Deals</h2><ul>{deal_rows}</ul>
+<nav class="MuiPagination-root">{buttons}</nav>"""
+    return PAGE.format(title=f"{name} | traded", head=head, main=main, filler=filler(rng))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    os.makedirs(args.out, exist_ok=True)
+    manifest = {"states": STATES, "listing_pages": LISTING_PAGES, "listing": {}, "profiles": {}}
+
+    def write(filename: str, html: str) -> str:
+        with open(os.path.join(args.out, filename), "w") as f:
+            f.write(html)
+        return filename
+
+    index = 0
+    for state in STATES:
+        state_slug = state.lower()
+        for page in range(1, LISTING_PAGES + 1):
+            agents = []
+            for _ in range(PROFILES_PER_PAGE):
+                index += 1
+                name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+                broker = {"name": name, "title": rng.choice(TITLES), "company": rng.choice(COMPANIES),
+                          "slug": slug(name, index), "linkedin": rng.choice(["panel", "panel", "embedded", "none"])}
+                agents.append((name, broker["company"], broker["slug"]))
+
+                # A spread of brokers: mostly-good, mixed and mostly-bad deal histories over 1-4 pages.
+                good_share = rng.choice([0.9, 0.6, 0.4, 0.1])
+                pages = rng.randint(1, 4)
+                deal_pages = []
+                for deal_page in range(1, pages + 1):
+                    deals = []
+                    for d in range(DEALS_PER_PAGE):
+                        good = rng.random() < good_share
+                        kind = GOOD_DEALS if good else BAD_DEALS
+                        text = f"Arranged ${rng.randint(2, 90)}M {rng.choice(kind)} in {rng.choice(CITIES)}"
+                        deals.append((f"{broker['slug']}-{deal_page}-{d}", text,
+                                      rng.choice(GOOD_LOAN_TYPES if good else BAD_LOAN_TYPES)))
+                    deal_pages.append(deals)
+                all_deals = [deal for deals in deal_pages for deal in deals]
+                files = [write(f"profile_{broker['slug']}_{deal_page}.html",
+                               profile_page(broker, deal_page, pages, deals, all_deals, rng))
+                         for deal_page, deals in enumerate(deal_pages, 1)]
+                manifest["profiles"][f"https://traded.co/agent/{broker['slug']}/"] = files
+
+            url = f"https://traded.co/agents/{state_slug}/loan/" + (f"?page={page}" if page > 1 else "")
+            manifest["listing"][url] = write(f"listing_{state_slug}_{page}.html",
+                                             listing_page(state, page, agents, rng))
+        # The page past the last one lists nobody, which ends pagination.
+        empty = f"https://traded.co/agents/{state_slug}/loan/?page={LISTING_PAGES + 1}"
+        manifest["listing"][empty] = write(f"listing_{state_slug}_{LISTING_PAGES + 1}.html",
+                                           listing_page(state, LISTING_PAGES + 1, [], rng))
+
+    with open(os.path.join(args.out, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f"Wrote {len(manifest['listing'])} listing pages and {len(manifest['profiles'])} profiles to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import metrics
+from extraction import normalize_profile_url
+
+PROFILE_CACHE_ENABLED = os.getenv("PROFILE_CACHE", "1") == "1"
+PROFILE_CACHE_PATH = os.getenv("PROFILE_CACHE_PATH", os.path.join(".cache", "profiles.sqlite3"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL_HOURS", "24")) * 3600
+PROFILE_CACHE_MAX_MB = float(os.getenv("PROFILE_CACHE_MAX_MB", "256"))
+
+
+class ProfileCache:
+    """
+    SQLite-backed cache of scraped profile data keyed by normalized profile
+    URL (see extraction.normalize_profile_url); methods take the URL in any form.
+
+    Each entry is a JSON object that analysis and discovery merge their fields
+    into (deals, deal_pages, job_title, linkedin, metadata). Entries older than
+    `ttl` seconds are treated as missing, and the least recently used entries
+    are evicted once the stored payloads exceed `max_bytes`.
+    """
+
+    def __init__(self, path: str = PROFILE_CACHE_PATH, ttl: float = PROFILE_CACHE_TTL,
+                 max_bytes: int = int(PROFILE_CACHE_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                " url TEXT PRIMARY KEY, data TEXT NOT NULL, size INTEGER NOT NULL,"
+                " updated_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS profiles_accessed ON profiles (accessed_at)")
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM profiles").fetchone()[0]
+
+    def _read(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT data, updated_at FROM profiles WHERE url = ?", (url,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def get(self, url: str, accept: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Optional[Dict[str, Any]]:
+        """
+        The fresh entry for `url`, or None if there is none or `accept(entry)` rejects it.
+        Hits and misses are counted on the current run (see metrics.track_run).
+        """
+        url = normalize_profile_url(url)
+        with self._lock:
+            entry = self._read(url)
+            if entry is not None and (accept is None or accept(entry)):
+                with self._conn:
+                    self._conn.execute("UPDATE profiles SET accessed_at = ? WHERE url = ?", (time.time(), url))
+                metrics.incr("cache_hits")
+                return entry
+        metrics.incr("cache_misses")
+        return None
+
+    def update(self, url: str, **fields: Any):
+        """Merge `fields` into the entry for `url`, restarting its TTL."""
+        url = normalize_profile_url(url)
+        with self._lock:
+            entry = self._read(url) or {}
+            entry.update(fields)
+            data = json.dumps(entry)
+            now = time.time()
+            old = self._conn.execute("SELECT size FROM profiles WHERE url = ?", (url,)).fetchone()
+            self._total_bytes += len(data) - (old[0] if old else 0)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO profiles (url, data, size, updated_at, accessed_at) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT(url) DO UPDATE SET data = excluded.data, size = excluded.size,"
+                    " updated_at = excluded.updated_at, accessed_at = excluded.accessed_at",
+                    (url, data, len(data), now, now))
+                self._evict()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        self._conn.execute("DELETE FROM profiles WHERE updated_at < ?", (time.time() - self.ttl,))
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM profiles").fetchone()[0]
+        cursor = self._conn.execute("SELECT url, size FROM profiles ORDER BY accessed_at")
+        stale = []
+        for url, size in cursor:
+            if self._total_bytes <= self.max_bytes:
+                break
+            stale.append((url,))
+            self._total_bytes -= size
+        cursor.close()
+        self._conn.executemany("DELETE FROM profiles WHERE url = ?", stale)
+
+    def invalidate(self, url: str):
+        url = normalize_profile_url(url)
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT size FROM profiles WHERE url = ?", (url,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+                self._conn.execute("DELETE FROM profiles WHERE url = ?", (url,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_profile_cache: Optional[ProfileCache] = None
+_profile_cache_lock = threading.Lock()
+
+
+def get_profile_cache() -> Optional[ProfileCache]:
+    """The shared ProfileCache, or None when caching is disabled."""
+    global _profile_cache
+    if not PROFILE_CACHE_ENABLED:
+        return None
+    with _profile_cache_lock:
+        if _profile_cache is None:
+            _profile_cache = ProfileCache()
+        return _profile_cache
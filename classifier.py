@@ -0,0 +1,191 @@
+import math
+import os
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence
+
+GOOD_KEYWORDS = [
+    "bridge", "construction", "acquisition", "refinance", "refinances", "mezzanine", "mezz", "rehab", "rehabilitation",
+    "development", "lease-up", "stabilization", "value-add", "repositioning", "transitional", "gap", "interim"
+]
+BAD_KEYWORDS = [
+    "permanent", "perm", "takeout", "fixed-rate", "amortizing", "agency", "conduit", "life company", "hud", "fannie",
+    "freddie"
+]
+
+GOOD, BAD, SKIP = "good", "bad", "skip"
+
+# Classify deals on their title plus the loan/property type that structured
+# deal sources (DEAL_SOURCE=embedded|network) carry. Off by default: it changes
+# % good compared with titles alone, and deals read from the DOM have no details.
+CLASSIFY_DEAL_DETAILS = os.getenv("CLASSIFY_DEAL_DETAILS", "0") == "1"
+
+# Keywords must start on a word boundary and may carry a plain inflection
+# ("refinanced", "acquisitions"), so "perm" no longer hits "permit" and "gap"
+# no longer hits "singapore".
+_SUFFIX = r"(?:s|es|d|ed|ing)?"
+
+
+def _keyword_pattern(keyword: str) -> str:
+    return re.escape(keyword.lower()).replace(r"\ ", r"\s+")
+
+
+class KeywordClassifier:
+    """
+    Good/bad deal-title classifier. Both keyword lists are compiled once into a
+    single alternation so a batch of titles is classified in one regex scan.
+    A title is good when it hits a good keyword and no bad one, bad when it hits
+    any bad keyword, and skipped otherwise. With `use_details` a deal's
+    details are classified along with its title (see deal_text).
+    """
+
+    def __init__(self, good_keywords: Iterable[str] = GOOD_KEYWORDS, bad_keywords: Iterable[str] = BAD_KEYWORDS,
+                 use_details: bool = CLASSIFY_DEAL_DETAILS):
+        self.use_details = use_details
+        self.good_keywords = [k.lower() for k in good_keywords if k.strip()]
+        self.bad_keywords = [k.lower() for k in bad_keywords if k.strip()]
+        self._labels: Dict[str, str] = {}
+        for keyword in self.good_keywords:
+            self._labels[keyword] = GOOD
+        for keyword in self.bad_keywords:
+            self._labels[keyword] = BAD
+        # Longest first so "mezzanine" wins over "mezz" and "permanent" over "perm".
+        keywords = sorted(self._labels, key=len, reverse=True)
+        if keywords:
+            alternation = "|".join(f"(?P<k{i}>{_keyword_pattern(k)})" for i, k in enumerate(keywords))
+            self._regex = re.compile(rf"(?<![a-z0-9])(?:{alternation}){_SUFFIX}(?![a-z0-9])", re.IGNORECASE)
+        else:
+            self._regex = None
+        self._group_labels = {f"k{i}": self._labels[k] for i, k in enumerate(keywords)}
+
+    def classify_titles(self, titles: Sequence[str]) -> List[str]:
+        """Label every title GOOD/BAD/SKIP with a single scan over the joined batch."""
+        if not titles or self._regex is None:
+            return [SKIP] * len(titles)
+        starts, offset = [], 0
+        for title in titles:
+            starts.append(offset)
+            offset += len(title) + 1
+        has_good = [False] * len(titles)
+        has_bad = [False] * len(titles)
+        # Joined on NUL, which no keyword pattern (multi-word ones allow \s+) can match across.
+        for match in self._regex.finditer("\0".join(titles)):
+            index = bisect_right(starts, match.start()) - 1
+            if self._group_labels[match.lastgroup] == BAD:
+                has_bad[index] = True
+            else:
+                has_good[index] = True
+        return [BAD if bad else GOOD if good else SKIP for good, bad in zip(has_good, has_bad)]
+
+    def classify(self, title: str) -> str:
+        return self.classify_titles([title])[0]
+
+    def deal_text(self, deal: Dict[str, str]) -> str:
+        """What a deal is classified on: its title, plus its details when `use_details` is on."""
+        details = deal.get('details') if self.use_details else None
+        return f"{deal['title']} {details}" if details else deal['title']
+
+    def score_deals(self, deals: Sequence[Dict[str, str]]) -> Dict:
+        """Good/bad/skipped counts, % good and the first good deal URL for a list of {'title', 'url'} deals."""
+        return self._score(deals, self.classify_titles([self.deal_text(deal) for deal in deals]))
+
+    def score_many(self, deal_lists: Sequence[Sequence[Dict[str, str]]]) -> List[Dict]:
+        """score_deals for many brokers at once: every title of every list is classified in a single scan."""
+        labels = self.classify_titles([self.deal_text(deal) for deals in deal_lists for deal in deals])
+        scores, offset = [], 0
+        for deals in deal_lists:
+            scores.append(self._score(deals, labels[offset:offset + len(deals)]))
+            offset += len(deals)
+        return scores
+
+    @staticmethod
+    def _score(deals: Sequence[Dict[str, str]], labels: List[str]) -> Dict:
+        good = labels.count(GOOD)
+        bad = labels.count(BAD)
+        categorized = good + bad
+        good_sample_url = None
+        for deal, label in zip(deals, labels):
+            if label == GOOD and deal['url']:
+                good_sample_url = absolute_deal_url(deal['url'])
+                break
+        return {
+            "good": good,
+            "bad": bad,
+            "skipped": len(labels) - categorized,
+            "pct_good": (good / categorized) * 100 if categorized else 0.0,
+            "good_sample_url": good_sample_url,
+        }
+
+    def first_good_deal_url(self, deals: Sequence[Dict[str, str]]) -> Optional[str]:
+        return self.score_deals(deals)["good_sample_url"]
+
+
+def absolute_deal_url(url: str) -> str:
+    return f"https://traded.co{url}" if url.startswith("/") else url
+
+
+class QualificationTracker:
+    """
+    Running good/bad tally over a broker's deals, fed one page at a time, that
+    tells pagination when the qualification verdict can no longer change.
+
+    Only the first `max_deals` deals count, as in the final score. Modes:
+    "bound" stops when no outcome of the deals still to load could flip the
+    verdict (exact); "confidence" also stops once the Wilson interval of the
+    good share, after at least `min_deals` categorized deals, lies entirely on
+    one side of the threshold; "off" never stops early.
+    """
+
+    MODES = ("off", "bound", "confidence")
+
+    def __init__(self, threshold: float, max_deals: int, mode: str = "bound", z: float = 1.96,
+                 min_deals: int = 10, classifier: Optional[KeywordClassifier] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown early-exit mode {mode!r}; expected one of {self.MODES}")
+        self.threshold = threshold
+        self.max_deals = max_deals
+        self.mode = mode
+        self.z = z
+        self.min_deals = min_deals
+        self.classifier = classifier or DEFAULT_CLASSIFIER
+        self.seen = self.good = self.bad = 0
+        self._urls = set()
+
+    def add(self, deals: Sequence[Dict[str, str]]):
+        fresh = [deal for deal in deals if deal['url'] not in self._urls][:max(0, self.max_deals - self.seen)]
+        self._urls.update(deal['url'] for deal in fresh)
+        labels = self.classifier.classify_titles([self.classifier.deal_text(deal) for deal in fresh])
+        self.seen += len(fresh)
+        self.good += labels.count(GOOD)
+        self.bad += labels.count(BAD)
+
+    def verdict(self, remaining: int) -> Optional[bool]:
+        """The settled verdict given at most `remaining` deals still to load, or None while it is open."""
+        if self.mode == "off":
+            return None
+        remaining = max(0, min(remaining, self.max_deals - self.seen))
+        categorized = self.good + self.bad
+        # Worst case every remaining deal is bad; best case every one is good.
+        if categorized and self.good * 100 >= self.threshold * (categorized + remaining):
+            return True
+        if categorized + remaining == 0 or (self.good + remaining) * 100 < self.threshold * (categorized + remaining):
+            return False
+        if self.mode == "confidence" and categorized >= self.min_deals:
+            low, high = self._wilson_interval(self.good, categorized)
+            if low * 100 >= self.threshold:
+                return True
+            if high * 100 < self.threshold:
+                return False
+        return None
+
+    def _wilson_interval(self, successes: int, n: int):
+        p, z2 = successes / n, self.z ** 2
+        center = (p + z2 / (2 * n)) / (1 + z2 / n)
+        half = self.z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+        return center - half, center + half
+
+
+DEFAULT_CLASSIFIER = KeywordClassifier()
+classify_titles = DEFAULT_CLASSIFIER.classify_titles
+score_deals = DEFAULT_CLASSIFIER.score_deals
+first_good_deal_url = DEFAULT_CLASSIFIER.first_good_deal_url
@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from extraction import normalize_profile_url
+DEAL_STORE_ENABLED = os.getenv("DEAL_STORE", "1") == "1"
+DEAL_STORE_PATH = os.getenv("DEAL_STORE_PATH", os.path.join(".cache", "deals.sqlite3"))
+
+
+class DealStore:
+    """
+    Persistent per-broker deal history keyed by normalized profile URL (see
+    extraction.normalize_profile_url), so every form of a profile's URL shares
+    one history; methods take the URL in any form. The set of stored
+    deal URLs doubles as the pagination watermark: once a deal page only shows
+    deals we already have, everything older is already on file.
+
+    That only holds for a complete history, one whose last read went down to
+    the end of the deal list (or the page limit) without gaps. A read that
+    stopped early (a settled verdict, a pagination timeout) leaves the
+    history partial until a later read completes it; see is_complete().
+    """
+
+    def __init__(self, path: str = DEAL_STORE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS deals ("
+                " profile_url TEXT NOT NULL, deal_url TEXT NOT NULL, title TEXT NOT NULL,"
+                " first_seen REAL NOT NULL, rank INTEGER NOT NULL, details TEXT NOT NULL DEFAULT '',"
+                " PRIMARY KEY (profile_url, deal_url))")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(deals)")}
+            if "details" not in columns:
+                # Stores created before deal details (loan/property type from structured sources) were kept.
+                self._conn.execute("ALTER TABLE deals ADD COLUMN details TEXT NOT NULL DEFAULT ''")
+            # Brokers without a row here (stores created before it existed) count as partial.
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS histories ("
+                " profile_url TEXT PRIMARY KEY, complete INTEGER NOT NULL, updated_at REAL NOT NULL)")
+            self._normalize_keys()
+
+    def _normalize_keys(self):
+        """Fold histories stored under other forms of a profile URL (stores from before keys were normalized)."""
+        urls = [row[0] for row in self._conn.execute("SELECT DISTINCT profile_url FROM deals")]
+        for url in urls:
+            key = normalize_profile_url(url)
+            if key == url:
+                continue
+            self._conn.execute("UPDATE OR IGNORE deals SET profile_url = ? WHERE profile_url = ?", (key, url))
+            self._conn.execute("DELETE FROM deals WHERE profile_url = ?", (url,))
+            # The merged history is only known to be complete once it is read again.
+            self._conn.execute("DELETE FROM histories WHERE profile_url IN (?, ?)", (url, key))
+
+    def known_urls(self, profile_url: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT deal_url FROM deals WHERE profile_url = ?",
+                                      (normalize_profile_url(profile_url),))
+            return {row[0] for row in rows}
+
+    def is_complete(self, profile_url: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT complete FROM histories WHERE profile_url = ?",
+                                     (normalize_profile_url(profile_url),)).fetchone()
+            return bool(row and row[0])
+
+    def complete_urls(self) -> Set[str]:
+        """Profile URLs (normalized) whose stored history is complete."""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT profile_url FROM histories WHERE complete = 1")}
+
+    def deals(self, profile_url: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Full stored history for a broker, newest first (the order traded.co lists them)."""
+        query = "SELECT title, deal_url, details FROM deals WHERE profile_url = ? ORDER BY first_seen DESC, rank"
+        params: tuple = (normalize_profile_url(profile_url),)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        with self._lock:
+            return [_deal(title, url, details) for title, url, details in self._conn.execute(query, params)]
+
+    def histories(self, profile_urls: Optional[List[str]] = None,
+                  limit: Optional[int] = None) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Stored history of every broker (or of `profile_urls`) by normalized
+        profile URL, newest first and capped at `limit` deals each.
+        """
+        query = ("SELECT profile_url, title, deal_url, details FROM ("
+                 " SELECT *, ROW_NUMBER() OVER (PARTITION BY profile_url ORDER BY first_seen DESC, rank) AS position"
+                 " FROM deals{where})"
+                 " WHERE ? IS NULL OR position <= ? ORDER BY profile_url, position")
+        if profile_urls is None:
+            batches = [(query.format(where=""), ())]
+        else:
+            # SQLite's default limit on bound parameters is 999.
+            keys = list(dict.fromkeys(map(normalize_profile_url, profile_urls)))
+            chunks = [keys[i:i + 500] for i in range(0, len(keys), 500)]
+            batches = [(query.format(where=f" WHERE profile_url IN ({', '.join('?' * len(chunk))})"), tuple(chunk))
+                       for chunk in chunks]
+        histories: Dict[str, List[Dict[str, str]]] = {}
+        with self._lock:
+            for batch_query, params in batches:
+                for profile_url, title, url, details in self._conn.execute(batch_query, params + (limit, limit)):
+                    histories.setdefault(profile_url, []).append(_deal(title, url, details))
+        return histories
+
+    def merge(self, profile_url: str, deals: List[Dict[str, str]], complete: bool) -> int:
+        """
+        Add newly scraped deals (in page order) to the history; returns how many
+        were new. Details are filled in on stored deals that were first seen
+        without them (e.g. from the DOM). `complete` says whether the read that
+        produced them leaves the history complete (see the class docstring).
+        """
+        now = time.time()
+        profile_url = normalize_profile_url(profile_url)
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO deals (profile_url, deal_url, title, first_seen, rank, details)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(profile_url, deal['url'], deal['title'], now, rank, deal.get('details', ''))
+                 for rank, deal in enumerate(deals)])
+            new_count = self._conn.total_changes - before
+            self._conn.executemany(
+                "UPDATE deals SET details = ? WHERE profile_url = ? AND deal_url = ? AND details = ''",
+                [(deal['details'], profile_url, deal['url']) for deal in deals if deal.get('details')])
+            self._conn.execute(
+                "INSERT INTO histories (profile_url, complete, updated_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(profile_url) DO UPDATE SET"
+                " complete = excluded.complete, updated_at = excluded.updated_at",
+                (profile_url, int(complete), now))
+            return new_count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _deal(title: str, url: str, details: str) -> Dict[str, str]:
+    deal = {'title': title, 'url': url}
+    if details:
+        deal['details'] = details
+    return deal
+
+
+_deal_store: Optional[DealStore] = None
+_deal_store_lock = threading.Lock()
+
+
+def get_deal_store() -> Optional[DealStore]:
+    """The shared DealStore, or None when the deal history is disabled."""
+    global _deal_store
+    if not DEAL_STORE_ENABLED:
+        return None
+    with _deal_store_lock:
+        if _deal_store is None:
+            _deal_store = DealStore()
+        return _deal_store
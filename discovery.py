@@ -1,215 +1,405 @@
-import time
+import contextvars
+import os
+import queue
 import random
-import requests
-from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
+import threading
+from typing import Callable, List, Dict, Optional, Set, Tuple
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 
-from scraper import (get_chrome_driver, login_to_traded, force_nav, human_delay, load_all_deals, GOOD_KEYWORDS,
-                     BAD_KEYWORDS)
+import metrics
+from driver_health import record_result
+from export import ExportSink
+from extraction import normalize_profile_url, parse_html, parse_profile_links, profile_links_from_driver
+from http_fetch import fetch_html
+from journal import ListingCheckpoint, get_run_journal
+from profile_index import ProfileIndex, get_profile_index
+from webhook import get_webhook_deliverer
+from scraper import force_nav, page_load_summary, qualify_snapshot, resolve_linkedin, take_profile_snapshot
 
-N8N_WEBHOOK_URL = "https://n8n.globbizenterprises.com/webhook/scraper-webhook"
+# Profiles waiting between the listing producer and the extraction workers.
+DISCOVERY_QUEUE_SIZE = int(os.getenv("DISCOVERY_QUEUE_SIZE", "50"))
+# The keys of every discovery row (ProfileSnapshot.metadata plus extract_broker_row's), in export column order.
+DISCOVERY_COLUMNS = ("Name", "First Name", "Last Name", "Location", "Traded Link to Profile", "Company", "Job Title",
+                     "Business Email", "Mobile Phone Number", "LinkedIn Profile",
+                     "Traded Link to Loan (Non-Stabilized)", "Qualified", "Good Deal %")
 
 
 def send_to_webhook(data: List[Dict], state: str):
+    """Hand a state's results to the background delivery queue; never waits on n8n."""
     if not data:
         return
-    print(f"  [Webhook] Sending {len(data)} results for {state} to n8n...")
-    try:
-        payload = {"state": state, "count": len(data), "brokers": data}
-        response = requests.post(N8N_WEBHOOK_URL, json=payload)
-        if response.status_code == 200:
-            print("  ✓ Webhook sent successfully.")
-        else:
-            print(f"  ✗ Webhook failed with status: {response.status_code}")
-    except Exception as e:
-        print(f"  ✗ Webhook error: {e}")
+    print(f"  [Webhook] Queued {len(data)} results for {state}.")
+    get_webhook_deliverer().enqueue(data, state)
 
 
-def collect_broker_links(driver, states: List[str], max_pages: int) -> List[Dict[str, str]]:
+def load_listing_links(driver, url: str) -> Optional[List[str]]:
+    """Profile URLs on a listing page, over HTTP when possible; None when the page shows no profiles."""
+    html = fetch_html(driver, url)
+    if html:
+        links = parse_profile_links(parse_html(html))
+        if links:
+            return links
+        print("    [HTTP] No server-rendered profiles. Using browser.")
+
+    force_nav(driver, url, endpoint="listing")
+    try:
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, "//a[normalize-space()='Profile']")))
+    except:
+        return None
+    return profile_links_from_driver(driver)
+
+
+def listing_url(state: str, page: int) -> str:
+    state_slug = state.lower().replace(" ", "-")
+    if page == 1:
+        return f"https://traded.co/agents/{state_slug}/loan/"
+    return f"https://traded.co/agents/{state_slug}/loan/?page={page}"
+
+
+def collect_listing_page(driver, state: str, page: int,
+                         checkpoint: Optional[ListingCheckpoint] = None) -> List[str]:
+    """Profile URLs on one listing page, replayed from (or recorded to) the checkpoint."""
+    state_slug = state.lower().replace(" ", "-")
+    links = checkpoint.get(state, page) if checkpoint else None
+    if links is not None:
+        print(f"  [Discovery] {state_slug} - Page {page} already collected.")
+        return links
+    print(f"  [Discovery] Scraping {state_slug} - Page {page}...")
+    links = load_listing_links(driver, listing_url(state, page)) or []
+    if checkpoint:
+        checkpoint.save(state, page, links)
+    return links
+
+
+def new_listing_urls(links: List[str], seen_urls: Set[str],
+                     index: Optional[ProfileIndex] = None) -> Tuple[List[str], Set[str]]:
+    """
+    The profile URLs on a listing page that are not in `seen_urls` (the pages
+    listed before; they are added to it), and those of them `index` holds as
+    freshly extracted.
+    """
+    new_urls = [url for url in links if url not in seen_urls]
+    seen_urls.update(new_urls)
+    known = index.fresh(new_urls) if index else set()
+    print(f"    Found {len(new_urls)} new profiles" + (f" ({len(known)} already known)." if known else "."))
+    return new_urls, known
+
+
+def collect_broker_links(driver, states: List[str], max_pages: int,
+                         checkpoint: Optional[ListingCheckpoint] = None,
+                         index: Optional[ProfileIndex] = None) -> List[Dict[str, str]]:
+    """
+    Profile URLs from each state's agent listing pages. With a checkpoint,
+    pages already collected by an earlier attempt of the run are replayed from
+    the journal and every newly collected page is recorded there. With an
+    index, profiles it holds as freshly extracted are left out.
+    """
     seen_urls = set()
     results = []
 
     for state in states:
-        state_slug = state.lower().replace(" ", "-")
         for page in range(1, max_pages + 1):
-            if page == 1:
-                url = f"https://traded.co/agents/{state_slug}/loan/"
-            else:
-                url = f"https://traded.co/agents/{state_slug}/loan/?page={page}"
-
-            print(f"  [Discovery] Scraping {state_slug} - Page {page}...")
             try:
-                driver.get(url)
-                try:
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.XPATH, "//a[normalize-space()='Profile']")))
-                except:
+                links = collect_listing_page(driver, state, page, checkpoint)
+                if not links:
                     print("    No profiles found. Stopping pagination.")
                     break
 
-                soup = BeautifulSoup(driver.page_source, "html.parser")
-                profile_buttons = soup.find_all("a", string="Profile")
-
-                count_on_page = 0
-                for btn in profile_buttons:
-                    href = btn.get('href')
-                    if href and href.startswith("/agent/"):
-                        full_url = f"https://traded.co{href}"
-                        if full_url not in seen_urls:
-                            seen_urls.add(full_url)
-                            results.append({"url": full_url, "state": state})
-                            count_on_page += 1
-
-                print(f"    Found {count_on_page} new profiles.")
-                if count_on_page == 0:
+                new_urls, known = new_listing_urls(links, seen_urls, index)
+                if not new_urls:
                     break
-                human_delay(2, 4)
+                results.extend({"url": url, "state": state} for url in new_urls if url not in known)
             except Exception as e:
-                print(f"    Error scraping {url}: {e}")
+                print(f"    Error scraping {listing_url(state, page)}: {e}")
                 continue
     return results
 
 
 def extract_broker_metadata(driver, profile_url: str) -> Dict[str, str]:
-    force_nav(driver, profile_url)
-    human_delay(1.5, 3)
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-
-    name = "Unknown"
-    first_name = ""
-    last_name = ""
-    h1 = soup.find("h1")
-    if h1:
-        name = h1.get_text(strip=True)
-        parts = name.split()
-        if parts:
-            first_name = parts[0]
-            if len(parts) > 1:
-                last_name = parts[-1]
-
-    company = "Unknown"
-    job_title = "Unknown"
-    position_element = soup.select_one("span[aria-label*='position in']")
-    if position_element:
-        strong_tag = position_element.find("strong")
-        if strong_tag:
-            company = strong_tag.get_text(strip=True)
-        full_text = position_element.get_text(strip=True)
-        if company != "Unknown":
-            temp_title = full_text.replace(company, "").strip()
-            job_title = temp_title[:-3].strip() if temp_title.lower().endswith(" at") else temp_title
-    else:
-        fallback_element = soup.select_one("span.MuiTypography-caption strong")
-        if fallback_element:
-            company = fallback_element.get_text(strip=True)
-            parent_text = fallback_element.parent.get_text(strip=True)
-            job_title = parent_text.replace(company, "").strip().removesuffix(" at").strip()
-
-    email = ""
-    mailto = soup.select_one('a[href^="mailto:"]')
-    if mailto:
-        email = mailto.get("href").replace("mailto:", "").split("?")[0]
-
-    phone_number = "Not Found"
-    phone_icon = soup.select_one('div[aria-label="phone icon"]')
-    if phone_icon:
-        phone_button = phone_icon.find_parent('button')
-        if phone_button:
-            phone_number = phone_button.get_text(strip=True)
-
-    traded_link_to_loan = None
-    deal_data = load_all_deals(driver, max_pages=3)
-    for deal in deal_data:
-        title = deal['title'].lower()
-        url = deal['url']
-        has_good = any(k in title for k in GOOD_KEYWORDS)
-        has_bad = any(k in title for k in BAD_KEYWORDS)
-        if has_good and not has_bad:
-            traded_link_to_loan = f"https://traded.co{url}" if url.startswith("/") else url
-            break
-
-    linkedin_url = ""
+    snapshot = take_profile_snapshot(driver, profile_url)
+    resolve_linkedin(driver, snapshot)
+    return snapshot.metadata()
+
+
+def extract_broker_row(driver, index: int, total: Optional[int], item: Dict[str, str],
+                       qualify: bool = False) -> Optional[Dict[str, str]]:
+    """
+    The discovery row for one profile. With `qualify` the same snapshot is also
+    scored, and the row carries "Qualified" and "Good Deal %" (discover-and-qualify).
+    """
+    url = item['url']
+    print(f"[{index}/{total}] {url}" if total else f"[{item['state']} #{index}] {url}")
     try:
-        wait = WebDriverWait(driver, 4)
-        about_button = wait.until(EC.element_to_be_clickable(
-            (By.XPATH, "//h2[normalize-space(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'))='about']")
-        ))
-        driver.execute_script("arguments[0].click();", about_button)
-        time.sleep(1.5)
-        
-        linkedin_element = wait.until(EC.presence_of_element_located(
-            (By.XPATH, "//a[contains(@href, 'linkedin.com') and contains(@aria-label, 'LinkedIn profile')]")
-        ))
-        raw_href = linkedin_element.get_attribute("href")
-        if raw_href:
-            linkedin_url = raw_href
-    except Exception:
-        pass
-
-    return {
-        "Name": name,
-        "First Name": first_name,
-        "Last Name": last_name,
-        "Traded Link to Profile": profile_url,
-        "Company": company,
-        "Job Title": job_title,
-        "Business Email": email,
-        "Mobile Phone Number": phone_number,
-        "LinkedIn Profile": linkedin_url,
-        "Traded Link to Loan (Non-Stabilized)": traded_link_to_loan
-    }
-
-
-def run_discovery_process(states: List[str], max_pages: int = 5) -> List[Dict[str, str]]:
+        snapshot = take_profile_snapshot(driver, url)
+        if qualify:
+            qualified, _, stats = qualify_snapshot(snapshot)
+        if not qualify or qualified:
+            resolve_linkedin(driver, snapshot)
+        data = snapshot.metadata()
+    except Exception as e:
+        print(f"    -> Error extracting data: {e}")
+        metrics.incr("errors")
+        record_result(driver, ok=False)
+        return None
+    record_result(driver, ok=True)
+
+    data['Location'] = item['state']
+    if qualify:
+        data['Qualified'] = qualified
+        data['Good Deal %'] = round(stats['pct_good'], 1)
+
+    deal_status = "✓ Found Loan" if data['Traded Link to Loan (Non-Stabilized)'] else "✗ No Loan"
+    verdict = (" | ✓ QUALIFIED" if qualified else " | ✗ Not qualified") if qualify else ""
+    print(f"    -> {data['Name']} | {deal_status} | LI: {data['LinkedIn Profile']}{verdict}")
+    return data
+
+
+class DiscoveryRunFailed(RuntimeError):
+    def __init__(self, run_id: str, error: Exception):
+        super().__init__(f"Discovery run {run_id} failed: {error}. Resubmit with run_id={run_id} to resume.")
+        self.run_id = run_id
+
+
+class StateProgress:
+    """Bookkeeping for one state while its profiles move through the pipeline."""
+
+    def __init__(self, state: str):
+        self.state = state
+        self.queued = 0
+        self.extracted = 0
+        self.listed = False
+        self.finished = False
+        self.rows: List[Tuple[int, Dict[str, str]]] = []
+
+    def ready(self) -> bool:
+        """True exactly once: when listing is over and every queued profile has been extracted."""
+        if self.finished or not self.listed or self.extracted < self.queued:
+            return False
+        self.finished = True
+        return True
+
+
+def run_discovery_process(states: List[str], max_pages: int = 5, pool=None, workers: Optional[int] = None,
+                          on_result: Optional[Callable[[Dict[str, str]], None]] = None,
+                          run_id: Optional[str] = None, qualify: bool = False,
+                          skip_known: bool = True, sink: Optional[ExportSink] = None) -> List[Dict[str, str]]:
+    """
+    Discover brokers across states as a pipeline: a listing producer walks the
+    states' listing pages and feeds profile URLs into a bounded queue while
+    `workers` extraction consumers drain it, so extraction of one state overlaps
+    with listing of the next. Each state's results are sent to the webhook as
+    soon as its last profile is extracted.
+
+    Every step is checkpointed in the run journal. Passing the `run_id` of a
+    failed or interrupted run resumes it: finished states, collected listing
+    pages and extracted profiles are read back instead of being scraped again.
+    A fatal error marks the run failed and is raised as DiscoveryRunFailed.
+
+    With `qualify` every profile is also scored from the same visit and only
+    qualified brokers are returned, streamed and sent to the webhook
+    (discover-and-qualify in one pass).
+
+    Every extracted profile is recorded in the cross-run profile index. With
+    `skip_known`, profiles extracted recently (by this run under another state
+    or by an earlier run, see profile_index.PROFILE_REFRESH_DAYS) are not
+    extracted again; older ones are refreshed.
+
+    With a `sink`, every row is written to it as soon as it is produced and
+    the run keeps no results in memory (it returns an empty list).
+    """
+    from driver_pool import DriverPool, SCRAPER_WORKERS
+
+    journal = get_run_journal()
+    resuming = bool(run_id and journal.get_run(run_id))
+    run_id = journal.start(states, max_pages, run_id)
+
     print("=" * 70)
-    print(f"STARTING DISCOVERY RUN FOR STATES: {states}")
+    print(f"{'RESUMING' if resuming else 'STARTING'} DISCOVERY RUN {run_id} FOR STATES: {states}")
     print("=" * 70)
-    driver = None
-    all_discovered_brokers = []
-
-    try:
-        driver = get_chrome_driver()
-        login_to_traded(driver)
-
-        for state in states:
-            print(f"\n>>> PROCESSING STATE: {state.upper()}")
-            state_items = collect_broker_links(driver, [state], max_pages)
-            if not state_items:
+    owns_pool = pool is None
+    if owns_pool:
+        pool = DriverPool(size=(workers or SCRAPER_WORKERS) + 1)
+    workers = max(1, workers or SCRAPER_WORKERS)
+    checkpoint = ListingCheckpoint(journal, run_id)
+    profile_index = get_profile_index()
+
+    # Drivers are checked out per listing page / per profile rather than per
+    # thread, so the producer never holds one while blocked on a full queue and
+    # the pipeline cannot deadlock on a pool smaller than workers + 1.
+    work: "queue.Queue[Optional[Tuple[StateProgress, int, Dict[str, str]]]]" = queue.Queue(
+        maxsize=DISCOVERY_QUEUE_SIZE)
+    progress_lock = threading.Lock()
+    emit_lock = threading.Lock()
+    stop = threading.Event()
+    failures: List[Exception] = []
+    # Normalized URLs queued by this run, so a broker listed under several states is extracted once.
+    queued_urls = set()
+    results_by_state: Dict[str, List[Dict[str, str]]] = {}
+
+    def keep(row) -> bool:
+        return bool(row) and (not qualify or row.get("Qualified", False))
+
+    def emit(row):
+        if on_result or sink is not None:
+            with emit_lock:
+                if sink is not None:
+                    sink.write(row)
+                if on_result:
+                    on_result(row)
+
+    def fail(error: Exception):
+        with progress_lock:
+            failures.append(error)
+        stop.set()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                work.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
                 continue
-
-            state_brokers_data = []
-            print(f"--- Extracting Data for {len(state_items)} profiles ---")
-
-            for i, item in enumerate(state_items, 1):  # Limiting to first 2 for testing
-                url = item['url']
-                print(f"[{i}/{len(state_items)}] {url}")
-                try:
-                    data = extract_broker_metadata(driver, url)
-
-                    data['Location'] = state
-
-                    deal_status = "✓ Found Loan" if data['Traded Link to Loan (Non-Stabilized)'] else "✗ No Loan"
-                    print(f"    -> {data['Name']} | {deal_status} | LI: {data['LinkedIn Profile']}")
-
-                    state_brokers_data.append(data)
-                except Exception as e:
-                    print(f"    -> Error extracting data: {e}")
-
-            if state_brokers_data:
-                send_to_webhook(state_brokers_data, state)
-                all_discovered_brokers.extend(state_brokers_data)
-
-            print(f"<<< FINISHED STATE: {state.upper()}\n")
-
-    except Exception as e:
-        print(f"Fatal error in discovery: {e}")
-    finally:
-        if driver:
-            driver.quit()
-        print("=" * 70)
-
-    return all_discovered_brokers
+        return False
+
+    def finish_state(progress: StateProgress):
+        rows = [row for _, row in sorted(progress.rows, key=lambda entry: entry[0])]
+        progress.rows = []
+        if sink is None:
+            results_by_state[progress.state] = rows
+        if rows:
+            send_to_webhook(rows, progress.state)
+        journal.mark_state_done(run_id, progress.state)
+        print(f"<<< FINISHED STATE: {progress.state.upper()} ({len(rows)} brokers)\n")
+
+    def produce():
+        try:
+            for state in states:
+                if stop.is_set():
+                    return
+                if journal.is_state_done(run_id, state):
+                    print(f"\n>>> STATE {state.upper()} ALREADY DONE IN RUN {run_id}")
+                    rows = [row for row in journal.extracted_profiles(run_id, state).values() if keep(row)]
+                    for row in rows:
+                        emit(row)
+                    if sink is None:
+                        results_by_state[state] = rows
+                    continue
+
+                print(f"\n>>> PROCESSING STATE: {state.upper()}")
+                progress = StateProgress(state)
+                done = journal.extracted_profiles(run_id, state)
+                if done:
+                    print(f"--- {len(done)} profiles already extracted in this run ---")
+                for row in done.values():
+                    if keep(row):
+                        emit(row)
+                        progress.rows.append((0, row))
+
+                seen_urls = set()
+                for page in range(1, max_pages + 1):
+                    try:
+                        with pool.driver() as driver:
+                            links = collect_listing_page(driver, state, page, checkpoint)
+                    except TimeoutError:
+                        raise
+                    except Exception as e:
+                        print(f"    Error scraping {listing_url(state, page)}: {e}")
+                        continue
+                    if not links:
+                        print("    No profiles found. Stopping pagination.")
+                        break
+                    new_urls, known = new_listing_urls(links, seen_urls, profile_index if skip_known else None)
+                    if not new_urls:
+                        break
+                    for url in new_urls:
+                        if url in done:
+                            continue
+                        key = normalize_profile_url(url)
+                        if url in known or (skip_known and key in queued_urls):
+                            metrics.incr("known_profiles_skipped")
+                            continue
+                        queued_urls.add(key)
+                        with progress_lock:
+                            progress.queued += 1
+                            index = progress.queued
+                        if not put((progress, index, {"url": url, "state": state})):
+                            return
+
+                with progress_lock:
+                    progress.listed = True
+                    ready = progress.ready()
+                if ready:
+                    finish_state(progress)
+        except Exception as e:
+            fail(e)
+        finally:
+            for _ in range(workers):
+                put(None)
+
+    def consume():
+        while True:
+            try:
+                entry = work.get(timeout=0.5)
+            except queue.Empty:
+                if stop.is_set():
+                    return
+                continue
+            if entry is None or stop.is_set():
+                return
+            progress, index, item = entry
+            try:
+                with pool.lease() as lease:
+                    row = lease.call(extract_broker_row, index, None, item, qualify=qualify)
+                if row:
+                    journal.save_profile(run_id, progress.state, item['url'], row)
+                    if profile_index:
+                        profile_index.mark(item['url'], progress.state)
+                if keep(row):
+                    emit(row)
+            except Exception as e:
+                fail(e)
+                return
+            with progress_lock:
+                progress.extracted += 1
+                if keep(row):
+                    progress.rows.append((index, row))
+                ready = progress.ready()
+            if ready:
+                finish_state(progress)
+
+    with metrics.track_run() as run_stats:
+        try:
+            # Each thread runs in a copy of this context so per-run stats (metrics.track_run) follow it.
+            threads = [threading.Thread(target=contextvars.copy_context().run, args=(produce,),
+                                        name="discovery-listing", daemon=True)]
+            threads += [threading.Thread(target=contextvars.copy_context().run, args=(consume,),
+                                         name=f"discovery-extract-{i}", daemon=True) for i in range(workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            if failures:
+                raise failures[0]
+
+            journal.complete(run_id)
+
+        except Exception as e:
+            print(f"Fatal error in discovery run {run_id}: {e}")
+            journal.fail(run_id, str(e))
+            raise DiscoveryRunFailed(run_id, e) from e
+        finally:
+            if owns_pool:
+                pool.close()
+            print(f"Profile cache: {run_stats.get('cache_hits'):.0f} hits / {run_stats.get('cache_misses'):.0f} misses")
+            print(f"Page loads: {page_load_summary(run_stats)}")
+            if profile_index:
+                print(f"Profile index: {run_stats.get('known_profiles_skipped'):.0f} known profiles skipped, "
+                      f"{profile_index.count()} on file")
+            print(f"Phase time: {metrics.phase_summary(run_stats)}")
+            print("=" * 70)
+
+    return [row for state in states for row in results_by_state.get(state, [])]
@@ -0,0 +1,117 @@
+import os
+import time
+from typing import Dict, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Recycle a driver after this many navigations, above this much resident memory
+# (Chrome and all its child processes) or after this many profiles in a row
+# failed on it. RSS is sampled at most every DRIVER_RSS_CHECK_SECONDS.
+DRIVER_MAX_NAVIGATIONS = int(os.getenv("DRIVER_MAX_NAVIGATIONS", "500"))
+DRIVER_MAX_RSS_MB = float(os.getenv("DRIVER_MAX_RSS_MB", "1500"))
+DRIVER_MAX_FAILURES = int(os.getenv("DRIVER_MAX_FAILURES", "3"))
+DRIVER_RSS_CHECK_SECONDS = float(os.getenv("DRIVER_RSS_CHECK_SECONDS", "30"))
+
+
+class DriverHealth:
+    """Usage and failure counters for one Chrome driver, read by the pool to decide when to recycle it."""
+
+    def __init__(self):
+        self.created_at = time.monotonic()
+        self.navigations = 0
+        self.consecutive_failures = 0
+        self.failed_last = False
+        self.rss_mb: Optional[float] = None
+        self._rss_checked_at = 0.0
+
+    def record(self, ok: bool):
+        self.failed_last = not ok
+        self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+
+    def sample_rss(self, driver, max_age: float = DRIVER_RSS_CHECK_SECONDS) -> Optional[float]:
+        """Resident memory of the driver's browser process tree in MB (None when it cannot be read)."""
+        now = time.monotonic()
+        if now - self._rss_checked_at >= max_age:
+            self._rss_checked_at = now
+            self.rss_mb = driver_rss_mb(driver)
+        return self.rss_mb
+
+    def threshold_reason(self, driver) -> Optional[str]:
+        """Why the driver is due for recycling on usage alone, or None."""
+        if self.navigations >= DRIVER_MAX_NAVIGATIONS:
+            return f"{self.navigations} navigations"
+        rss = self.sample_rss(driver)
+        if rss is not None and rss >= DRIVER_MAX_RSS_MB:
+            return f"RSS {rss:.0f} MB"
+        if self.consecutive_failures >= DRIVER_MAX_FAILURES:
+            return f"{self.consecutive_failures} consecutive failures"
+        return None
+
+
+def health_of(driver) -> DriverHealth:
+    health = getattr(driver, "health", None)
+    if health is None:
+        health = driver.health = DriverHealth()
+    return health
+
+
+def record_navigation(driver):
+    health_of(driver).navigations += 1
+
+
+def record_result(driver, ok: bool):
+    """Called once per profile with whether it was scraped without an error."""
+    health_of(driver).record(ok)
+
+
+def driver_rss_mb(driver) -> Optional[float]:
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None)
+    if process is None:
+        return None
+    rss = _tree_rss_bytes(process.pid)
+    return rss / (1024 * 1024) if rss is not None else None
+
+
+def _tree_rss_bytes(pid: int) -> Optional[int]:
+    """RSS of `pid` (chromedriver) plus all its descendants (the browser, renderers, GPU process)."""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+    if not os.path.isdir("/proc"):
+        return None
+    # No psutil: walk /proc (Linux).
+    children: Dict[int, list] = {}
+    rss: Dict[int, int] = {}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+        rss[int(entry)] = int(fields[21]) * page_size
+    if pid not in rss:
+        return None
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total
@@ -0,0 +1,291 @@
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from selenium import webdriver
+
+import metrics
+from driver_health import health_of
+from scraper import capture_session, get_chrome_driver, login_to_traded, restore_session, LOGIN_PROMPT_LOCATOR
+from session_store import get_session_store
+
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "1"))
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", str(DRIVER_POOL_SIZE)))
+DRIVER_CHECKOUT_TIMEOUT = float(os.getenv("DRIVER_CHECKOUT_TIMEOUT", "600"))
+
+
+def is_driver_healthy(driver: webdriver.Chrome) -> bool:
+    """Cheap liveness + session check, run every time a driver is checked out."""
+    try:
+        driver.execute_script("return document.readyState")
+        if "traded.co" in (driver.current_url or ""):
+            return not driver.find_elements(*LOGIN_PROMPT_LOCATOR)
+        return bool(driver.get_cookies())
+    except Exception:
+        return False
+
+
+class DriverPool:
+    """
+    A fixed-size pool of logged-in Chrome drivers shared across API requests.
+    Drivers are booted and authenticated once, health-checked on checkout and
+    returned after each job instead of being quit.
+
+    The pool also supervises its drivers (see driver_health.DriverHealth and
+    DriverLease): a driver that passes its navigation, memory or
+    consecutive-failure limits, or is found crashed or logged out after a
+    failed profile, is replaced. New drivers are logged in by replaying the
+    saved session (cookies and localStorage, persisted encrypted across
+    restarts, see session_store.py) and only fall back to login_to_traded when
+    it no longer works.
+    """
+
+    def __init__(self, size: int = DRIVER_POOL_SIZE):
+        self.size = max(1, size)
+        self._idle: "queue.Queue[webdriver.Chrome]" = queue.Queue()
+        self._drivers: List[webdriver.Chrome] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._store = get_session_store()
+        self._session: Optional[Dict[str, Any]] = self._store.load() if self._store else None
+
+    def _new_driver(self) -> webdriver.Chrome:
+        driver = get_chrome_driver()
+        try:
+            with self._lock:
+                session = self._session or {}
+            if restore_session(driver, session.get("cookies", []), session.get("local_storage")):
+                print("[DriverPool] ✓ Session restored from saved cookies.")
+                metrics.incr("sessions_restored")
+            else:
+                login_to_traded(driver)
+            self.save_session(driver)
+        except Exception:
+            driver.quit()
+            raise
+        return driver
+
+    def save_session(self, driver: webdriver.Chrome):
+        """Keep the driver's session for logging in new drivers, on disk as well when the session store is on."""
+        try:
+            session = capture_session(driver)
+        except Exception:
+            return
+        if not session["cookies"]:
+            return
+        with self._lock:
+            self._session = session
+        if self._store:
+            try:
+                self._store.save(session["cookies"], session["local_storage"])
+            except OSError as e:
+                print(f"[DriverPool] Could not save the session: {e}")
+
+    def _discard(self, driver: webdriver.Chrome):
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _reserve_slot(self) -> bool:
+        with self._lock:
+            if len(self._drivers) < self.size:
+                self._drivers.append(None)
+                return True
+            return False
+
+    def _fill_slot(self) -> webdriver.Chrome:
+        try:
+            driver = self._new_driver()
+        except Exception:
+            with self._lock:
+                self._drivers.remove(None)
+            raise
+        with self._lock:
+            self._drivers[self._drivers.index(None)] = driver
+        return driver
+
+    def start(self):
+        print(f"[DriverPool] Warming up {self.size} driver(s)...")
+        while self._reserve_slot():
+            self._idle.put(self._fill_slot())
+        print(f"[DriverPool] ✓ {self._idle.qsize()} driver(s) ready.")
+
+    def acquire(self, timeout: Optional[float] = DRIVER_CHECKOUT_TIMEOUT) -> webdriver.Chrome:
+        if self._closed:
+            raise RuntimeError("DriverPool is closed")
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                if self._reserve_slot():
+                    return self._fill_slot()
+                try:
+                    driver = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No driver became available within {timeout}s")
+            if is_driver_healthy(driver):
+                return driver
+            return self.recycle(driver, "failed health check")
+
+    def recycle(self, driver: webdriver.Chrome, reason: str) -> webdriver.Chrome:
+        """Quit `driver` and put a freshly started, logged-in driver in its slot."""
+        print(f"[DriverPool] Recycling driver ({reason})...")
+        metrics.incr("drivers_recycled")
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers[self._drivers.index(driver)] = None
+            else:
+                self._drivers.append(None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        return self._fill_slot()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = DRIVER_CHECKOUT_TIMEOUT):
+        """Like driver(), but yields a supervised DriverLease for callers that scrape many profiles with it."""
+        with metrics.timer("driver_checkout"):
+            lease = DriverLease(self, self.acquire(timeout), timeout)
+        try:
+            yield lease
+        finally:
+            if lease.driver is not None:
+                self.release(lease.driver)
+
+    def release(self, driver: webdriver.Chrome):
+        if self._closed:
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    @contextmanager
+    def driver(self, timeout: Optional[float] = DRIVER_CHECKOUT_TIMEOUT):
+        with metrics.timer("driver_checkout"):
+            driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            drivers = [d for d in self._drivers if d is not None]
+            self._drivers = []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        print(f"[DriverPool] Closed {len(drivers)} driver(s).")
+
+
+class DriverLease:
+    """
+    A checked-out driver under supervision. call() runs one profile on it:
+    before the call the driver is recycled if it has passed its usage limits
+    (its session is saved first, it is still good), and when the call
+    failed and left the driver crashed, logged out or failing repeatedly, the
+    driver is recycled and the profile is retried once on the new one.
+
+    When a replacement cannot be started (e.g. the login fails) the lease is
+    left without a driver (`driver` is None) and its slot is freed; the next
+    call checks a driver out of the pool again, and a profile that gets none
+    counts as failed (fn's result is None) instead of ending the run.
+    """
+
+    def __init__(self, pool: DriverPool, driver: webdriver.Chrome,
+                 timeout: Optional[float] = DRIVER_CHECKOUT_TIMEOUT):
+        self.pool = pool
+        self.driver: Optional[webdriver.Chrome] = driver
+        self.timeout = timeout
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """fn(driver, *args, **kwargs); fn reports failures through driver_health.record_result."""
+        if self.driver is not None:
+            reason = health_of(self.driver).threshold_reason(self.driver)
+            if reason:
+                self.pool.save_session(self.driver)
+                self._recycle(reason)
+        if self.driver is None and not self._reacquire():
+            print("[DriverPool] ❌ No driver for this profile. Counting it as failed.")
+            metrics.incr("errors")
+            return None
+
+        result = fn(self.driver, *args, **kwargs)
+        health = health_of(self.driver)
+        if not health.failed_last:
+            return result
+        reason = health.threshold_reason(self.driver)
+        if reason is None and not is_driver_healthy(self.driver):
+            reason = "crashed or logged out"
+        if reason is None:
+            return result  # The profile failed on its own; the driver is fine.
+        if not self._recycle(reason):
+            return result
+        print("[DriverPool] Retrying the failed profile on the new driver...")
+        metrics.incr("profiles_retried")
+        return fn(self.driver, *args, **kwargs)
+
+    def _recycle(self, reason: str) -> bool:
+        driver, self.driver = self.driver, None
+        try:
+            self.driver = self.pool.recycle(driver, reason)
+        except Exception as e:
+            print(f"[DriverPool] Could not start a replacement driver: {e}")
+            metrics.incr("driver_recycle_failures")
+            return False
+        return True
+
+    def _reacquire(self) -> bool:
+        try:
+            self.driver = self.pool.acquire(self.timeout)
+        except Exception as e:
+            print(f"[DriverPool] Could not check out a driver: {e}")
+            return False
+        return True
+
+
+def map_with_drivers(pool: DriverPool, items: Sequence[Any], fn: Callable[[webdriver.Chrome, int, Any], Any],
+                     workers: Optional[int] = None) -> List[Any]:
+    """
+    Spread `items` over up to `workers` drivers checked out of `pool` and call
+    fn(driver, index, item) for each one. Every driver paces its own requests
+    (see pacing.limiter_for). Results are returned in input order.
+    """
+    if not items:
+        return []
+    workers = max(1, min(workers or SCRAPER_WORKERS, pool.size, len(items)))
+    results: List[Any] = [None] * len(items)
+    work: "queue.Queue[Tuple[int, Any]]" = queue.Queue()
+    for entry in enumerate(items):
+        work.put(entry)
+
+    def worker():
+        with pool.lease() as lease:
+            while True:
+                try:
+                    index, item = work.get_nowait()
+                except queue.Empty:
+                    return
+                results[index] = lease.call(fn, index, item)
+
+    if workers == 1:
+        worker()
+        return results
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape-worker") as executor:
+        # Each worker runs in a copy of the caller's context so per-run stats (metrics.track_run) follow it.
+        futures = [executor.submit(contextvars.copy_context().run, worker) for _ in range(workers)]
+        for future in futures:
+            future.result()
+    return results
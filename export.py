@@ -0,0 +1,200 @@
+import csv
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_FLUSH_ROWS = int(os.getenv("EXPORT_FLUSH_ROWS", "100"))
+EXPORT_FLUSH_SECONDS = float(os.getenv("EXPORT_FLUSH_SECONDS", "5"))
+EXPORT_ROTATE_ROWS = int(os.getenv("EXPORT_ROTATE_ROWS", "50000"))
+EXPORT_ROTATE_MB = float(os.getenv("EXPORT_ROTATE_MB", "100"))
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+
+class ExportSink:
+    """
+    Writes result rows to CSV, JSONL or Parquet files as they are produced,
+    so a run's results never have to be held in memory.
+
+    Rows are flushed every `flush_rows` rows and at least every
+    `flush_seconds` (a background thread covers quiet periods), so CSV and
+    JSONL files can be tailed while the run is going. Files rotate to a new
+    part (`<name>-0002.<format>`, ...) after `rotate_rows` rows or
+    `rotate_mb` MB. Parquet buffers rows until the next flush, writes each
+    flush as a row group and is only readable once its part is closed;
+    it needs pyarrow.
+
+    CSV and Parquet files have the given `columns` (the first row's keys
+    when there are none): missing values are left empty and other keys are
+    dropped. Parquet columns are nullable strings, so a column that happens
+    to be empty in the first row group does not fix the schema to null.
+    """
+
+    def __init__(self, format: str, name: str, columns: Optional[Sequence[str]] = None,
+                 directory: str = EXPORT_DIR, flush_rows: int = EXPORT_FLUSH_ROWS,
+                 flush_seconds: float = EXPORT_FLUSH_SECONDS, rotate_rows: int = EXPORT_ROTATE_ROWS,
+                 rotate_mb: float = EXPORT_ROTATE_MB):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {format!r}; expected one of {EXPORT_FORMATS}")
+        if format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError as e:
+                raise ValueError("Parquet export needs pyarrow: pip install pyarrow") from e
+        self.format = format
+        self.name = name
+        self.columns = list(columns) if columns else None
+        self.directory = directory
+        self.flush_rows = max(1, flush_rows)
+        self.flush_seconds = flush_seconds
+        self.rotate_rows = rotate_rows
+        self.rotate_bytes = int(rotate_mb * 1024 * 1024)
+        self.files: List[str] = []
+        self.rows = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer = None
+        self._buffer: List[Dict[str, Any]] = []
+        self._part_rows = 0
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name=f"export-{name}", daemon=True)
+        self._flusher.start()
+
+    def __enter__(self) -> "ExportSink":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, row: Dict[str, Any]):
+        with self._lock:
+            if self._closed.is_set():
+                raise RuntimeError(f"Export {self.name} is closed")
+            if self._file is None and self._writer is None:
+                self._open_part()
+            if self.format == "csv":
+                self._writer.writerow(row)
+            elif self.format == "jsonl":
+                self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                self._buffer.append(row)
+            self.rows += 1
+            self._part_rows += 1
+            self._unflushed += 1
+            if self._unflushed >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds:
+                self._flush()
+            if self._part_rows >= self.rotate_rows or self._part_size() >= self.rotate_bytes:
+                self._close_part()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+            self._close_part()
+        self._flusher.join(timeout=1)
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"format": self.format, "files": list(self.files), "rows": self.rows,
+                    "closed": self._closed.is_set()}
+
+    # Parts ----------------------------------------------------------------
+
+    def _open_part(self):
+        path = os.path.join(self.directory, f"{self.name}-{len(self.files) + 1:04d}.{self.format}")
+        self.files.append(path)
+        self._part_rows = 0
+        if self.format == "parquet":
+            self._writer = _ParquetPart(path, self.columns)
+            return
+        self._file = open(path, "w", newline="" if self.format == "csv" else None, encoding="utf-8")
+        if self.format == "csv":
+            self._writer = _LazyHeaderWriter(self._file, self.columns)
+
+    def _part_size(self) -> int:
+        try:
+            return os.path.getsize(self.files[-1])
+        except OSError:
+            return 0  # A Parquet part is not created until its first row group is written.
+
+    def _flush(self):
+        if self.format == "parquet":
+            if self._writer is not None and self._buffer:
+                self._writer.write(self._buffer)
+            self._buffer = []
+        elif self._file is not None:
+            self._file.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def _close_part(self):
+        self._flush()
+        if self._file is not None:
+            self._file.close()
+        elif self._writer is not None:
+            self._writer.close()
+        self._file = self._writer = None
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_seconds):
+            with self._lock:
+                if self._unflushed and not self._closed.is_set():
+                    self._flush()
+
+
+class _LazyHeaderWriter:
+    """csv.DictWriter over `columns` (or the first row's keys); gaps are written as "" and extra keys dropped."""
+
+    def __init__(self, file, columns: Optional[List[str]] = None):
+        self._file = file
+        self._columns = columns
+        self._writer: Optional[csv.DictWriter] = None
+
+    def writerow(self, row: Dict[str, Any]):
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=self._columns or list(row), restval="",
+                                          extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow(row)
+
+
+class _ParquetPart:
+    """One Parquet file of nullable string columns, written a row group at a time."""
+
+    def __init__(self, path: str, columns: Optional[List[str]] = None):
+        self.path = path
+        self._columns = columns
+        self._writer = None
+
+    def write(self, rows: List[Dict[str, Any]]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._writer is None:
+            columns = self._columns or list(rows[0])
+            schema = pa.schema([pa.field(column, pa.string()) for column in columns])
+            self._writer = pq.ParquetWriter(self.path, schema)
+        schema = self._writer.schema
+        table = pa.Table.from_pylist([{column: _string(row.get(column)) for column in schema.names} for row in rows],
+                                     schema=schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _string(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
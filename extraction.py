@@ -0,0 +1,366 @@
+import base64
+import json
+import re
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+DEAL_LINK_SELECTOR = 'a[class*="MuiTypography-bBase"][href*="/deals/"]'
+LINKEDIN_SELECTOR = 'a[href*="linkedin.com"][aria-label*="LinkedIn profile"]'
+# The deal list's empty state. Without it a profile that shows no deal links
+# cannot be told from one whose deal list has not rendered yet, so only a
+# profile that says it has no deals is read as having none.
+NO_DEALS_TEXT = "No deals"
+NO_DEALS_XPATH = f"//*[not(*) and starts-with(normalize-space(), '{NO_DEALS_TEXT}')]"
+# The broker's personal LinkedIn URL inside the page's embedded data: a
+# "linkedin"-named field of the agent object in the Next.js hydration state,
+# or "sameAs" of the page's top-level JSON-LD Person. LinkedIn URLs elsewhere
+# in that data (co-brokers, related agents) are not the broker's, and company
+# pages are deliberately not matched.
+EMBEDDED_DATA_SELECTOR = 'script#__NEXT_DATA__, script[type="application/ld+json"]'
+LINKEDIN_URL_PATTERN = re.compile(r'https?://(?:[a-z]{2,3}\.)?linkedin\.com/(?:in|pub)/[^"\'\s\\<>]+', re.IGNORECASE)
+HYDRATION_SELECTOR = "script#__NEXT_DATA__"
+# Keys a deal object in hydration/XHR JSON carries its title and link under,
+# and the type fields kept as its details (classified along with the title
+# only with CLASSIFY_DEAL_DETAILS, see classifier.KeywordClassifier.deal_text).
+DEAL_TITLE_KEYS = ("title", "headline", "summary", "name")
+DEAL_URL_KEYS = ("url", "href", "path", "permalink", "link")
+# Where the profile's own deal list sits in a payload: under a "deals" key of
+# the page props (hydration state) or of the response root / "data" (XHR), or
+# of the agent object held there. Deals anywhere else (other agents, related
+# deals) are not the profile's and are ignored.
+PAYLOAD_ROOT_PATHS = (("props", "pageProps"), ("pageProps",), ("data",), ())
+PROFILE_OBJECT_KEYS = ("agent", "profile", "broker")
+# Connection/pagination wrappers between a "deals" key and the deal objects.
+PAYLOAD_WRAPPER_KEYS = ("edges", "node", "nodes", "items", "results", "data", "deal")
+DEAL_DETAIL_KEYS = ("loanType", "loan_type", "dealType", "deal_type", "financingType", "financing_type",
+                    "propertyType", "property_type", "assetType", "asset_type")
+
+# Field extraction that runs inside the page: one execute_script round trip
+# returns exactly the values we need instead of serializing the whole DOM via
+# driver.page_source and re-parsing it. Every snippet mirrors the BeautifulSoup
+# parser below it so the HTTP fast path and the browser return the same shape.
+_JS_HELPERS = """
+const text = (el) => el ? el.textContent.replace(/\\s+/g, ' ').trim() : null;
+const deals = () => Array.from(document.querySelectorAll(arguments[0]))
+    .map((a) => ({title: text(a), url: a.getAttribute('href') || ''}))
+    .filter((d) => d.url && d.title.length > 20);
+const hasPage = (n) => document.querySelector(`button[aria-label="Go to page ${n}"]`) !== null;
+"""
+
+DEALS_JS = _JS_HELPERS + """
+return {deals: deals(), has_next_page: hasPage(arguments[1])};
+"""
+
+PROFILE_JS = _JS_HELPERS + """
+const h1 = document.querySelector('h1');
+const headline = document.querySelector('h1 + p');
+const position = document.querySelector("span[aria-label*='position in']");
+const caption = document.querySelector('span.MuiTypography-caption strong');
+const mailto = document.querySelector('a[href^="mailto:"]');
+const phoneIcon = document.querySelector('div[aria-label="phone icon"]');
+const phoneButton = phoneIcon ? phoneIcon.closest('button') : null;
+const linkedin = document.querySelector(arguments[2]);
+return {
+    name: text(h1),
+    headline: text(headline),
+    position_text: text(position),
+    position_company: position ? text(position.querySelector('strong')) : null,
+    caption_company: text(caption),
+    caption_text: caption ? text(caption.parentElement) : null,
+    email_href: mailto ? mailto.getAttribute('href') : null,
+    phone: text(phoneButton),
+    linkedin: linkedin ? linkedin.getAttribute('href') : null,
+    deals: deals(),
+    has_next_page: hasPage(arguments[1]),
+};
+"""
+
+HYDRATION_JS = """
+const script = document.querySelector(arguments[0]);
+return script ? script.textContent : null;
+"""
+
+EMBEDDED_DATA_JS = """
+return Array.from(document.querySelectorAll(arguments[0])).map((script) => script.textContent);
+"""
+
+PROFILE_LINKS_JS = """
+return Array.from(document.querySelectorAll('a'))
+    .filter((a) => a.textContent.trim() === 'Profile')
+    .map((a) => a.getAttribute('href'))
+    .filter((href) => href && href.startsWith('/agent/'));
+"""
+
+
+def parse_html(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+def _text(element) -> Optional[str]:
+    return element.get_text(" ", strip=True) if element is not None else None
+
+
+def parse_deal_links(soup: BeautifulSoup) -> List[Dict[str, str]]:
+    deals = []
+    for link in soup.select(DEAL_LINK_SELECTOR):
+        url, title = link.get("href", ""), _text(link)
+        if url and len(title) > 20:
+            deals.append({'title': title, 'url': url})
+    return deals
+
+
+def has_deal_page(soup: BeautifulSoup, page: int) -> bool:
+    return soup.select_one(f'button[aria-label="Go to page {page}"]') is not None
+
+
+def shows_no_deals(soup: BeautifulSoup) -> bool:
+    return soup.find(string=lambda text: text.strip().startswith(NO_DEALS_TEXT)) is not None
+
+
+def _linkedin_url(value: Any) -> Optional[str]:
+    match = LINKEDIN_URL_PATTERN.match(value.strip()) if isinstance(value, str) else None
+    return match.group(0) if match else None
+
+
+def _is_person(node: Any) -> bool:
+    types = node.get("@type") if isinstance(node, dict) else None
+    return types == "Person" or (isinstance(types, list) and "Person" in types)
+
+
+def linkedin_from_embedded_data(texts: List[Optional[str]]) -> Optional[str]:
+    """The broker's personal LinkedIn URL from the texts of the EMBEDDED_DATA_SELECTOR scripts, if they carry one."""
+    for text in texts:
+        try:
+            payload = json.loads(text or "")
+        except ValueError:
+            continue
+        # Next.js hydration state: the agent object (or the page props) of the profile.
+        for node in _profile_objects(payload):
+            for key, value in node.items():
+                url = _linkedin_url(value) if "linkedin" in str(key).lower() else None
+                if url:
+                    return url
+        # JSON-LD: the page's own Person, not people nested inside it.
+        nodes = payload if isinstance(payload, list) else [payload]
+        nodes += [node for item in nodes if isinstance(item, dict) for node in item.get("@graph", [])]
+        for node in filter(_is_person, nodes):
+            same_as = node.get("sameAs")
+            for value in same_as if isinstance(same_as, list) else [same_as]:
+                url = _linkedin_url(value)
+                if url:
+                    return url
+    return None
+
+
+def embedded_linkedin(soup: BeautifulSoup) -> Optional[str]:
+    return linkedin_from_embedded_data([script.string for script in soup.select(EMBEDDED_DATA_SELECTOR)])
+
+
+def _deal_url(value: Any) -> Optional[str]:
+    """A deal link as the DOM has it ("/deals/<slug>/"), from an absolute or relative URL."""
+    if not isinstance(value, str) or "/deals/" not in value:
+        return None
+    path = "/deals/" + value.split("/deals/", 1)[1].split("?", 1)[0].split("#", 1)[0]
+    return path if path.endswith("/") else path + "/"
+
+
+def _payload_deal(item: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    title = next((item[key] for key in DEAL_TITLE_KEYS if isinstance(item.get(key), str)), "")
+    title = " ".join(title.split())
+    url = next((url for url in map(_deal_url, (item.get(key) for key in DEAL_URL_KEYS)) if url), None)
+    if url is None and isinstance(item.get("slug"), str):
+        url = f"/deals/{item['slug']}/"
+    # Same filter as the DOM scrapers: very short titles are labels, not deal descriptions.
+    if not url or len(title) <= 20:
+        return None
+    deal = {'title': title, 'url': url}
+    details = [item[key].strip() for key in DEAL_DETAIL_KEYS if isinstance(item.get(key), str) and item[key].strip()]
+    if details:
+        deal['details'] = " ".join(dict.fromkeys(details))
+    return deal
+
+
+def _profile_objects(payload: Any) -> List[Dict[str, Any]]:
+    """The objects of a payload that describe the profile itself: the roots in PAYLOAD_ROOT_PATHS and their agent."""
+    objects = []
+    for path in PAYLOAD_ROOT_PATHS:
+        node = payload
+        for key in path:
+            node = node.get(key) if isinstance(node, dict) else None
+        if isinstance(node, dict):
+            objects.append(node)
+            objects.extend(node[key] for key in PROFILE_OBJECT_KEYS if isinstance(node.get(key), dict))
+    return objects
+
+
+def _profile_deal_lists(payload: Any) -> List[Any]:
+    """The values of the "deals"-named keys where a payload keeps the profile's deal list."""
+    return [value for node in _profile_objects(payload) for key, value in node.items() if "deals" in str(key).lower()]
+
+
+def deals_from_payload(payload: Any) -> List[Dict[str, str]]:
+    """
+    The profile's deals in a JSON payload (Next.js hydration state or an XHR
+    response), in document order and without duplicates. Only the profile's
+    own deal list is read (see PAYLOAD_ROOT_PATHS), through list and
+    connection wrappers; a deal is an object in it with a title and a
+    /deals/ link or slug.
+    """
+    deals, seen = [], set()
+
+    def walk(node: Any):
+        if isinstance(node, list):
+            for value in node:
+                walk(value)
+        elif isinstance(node, dict):
+            deal = _payload_deal(node)
+            if deal is None:
+                for key in PAYLOAD_WRAPPER_KEYS:
+                    walk(node.get(key))
+            elif deal['url'] not in seen:
+                seen.add(deal['url'])
+                deals.append(deal)
+
+    for deal_list in _profile_deal_lists(payload):
+        walk(deal_list)
+    return deals
+
+
+def deals_from_json_text(text: Optional[str]) -> List[Dict[str, str]]:
+    if not text:
+        return []
+    try:
+        return deals_from_payload(json.loads(text))
+    except ValueError:
+        return []
+
+
+def embedded_deals(soup: BeautifulSoup) -> List[Dict[str, str]]:
+    """Deals in the page's Next.js hydration state, which can hold more than the first rendered page."""
+    script = soup.select_one(HYDRATION_SELECTOR)
+    return deals_from_json_text(script.string if script else None)
+
+
+def complete_deal_list(page_deals: List[Dict[str, str]], structured: List[Dict[str, str]],
+                       has_next_page: bool) -> Optional[List[Dict[str, str]]]:
+    """
+    `structured` (deals from JSON) when it can stand in for clicking through
+    the deal pages: it contains every deal rendered on the first page and
+    either goes past it or there is no second page. None otherwise.
+    """
+    if not structured:
+        return None
+    structured_urls = {deal['url'] for deal in structured}
+    if any(deal['url'] not in structured_urls for deal in page_deals):
+        return None
+    if has_next_page and len(structured) <= len(page_deals):
+        return None
+    return structured
+
+
+def parse_profile_fields(soup: BeautifulSoup) -> Dict[str, Any]:
+    """The same fields PROFILE_JS returns, read from server-rendered HTML, plus the hydration-state deals."""
+    position = soup.select_one("span[aria-label*='position in']")
+    caption = soup.select_one("span.MuiTypography-caption strong")
+    mailto = soup.select_one('a[href^="mailto:"]')
+    phone_icon = soup.select_one('div[aria-label="phone icon"]')
+    phone_button = phone_icon.find_parent('button') if phone_icon else None
+    linkedin = soup.select_one(LINKEDIN_SELECTOR)
+    return {
+        "name": _text(soup.find("h1")),
+        "headline": _text(soup.select_one("h1 + p")),
+        "position_text": _text(position),
+        "position_company": _text(position.find("strong")) if position else None,
+        "caption_company": _text(caption),
+        "caption_text": _text(caption.parent) if caption else None,
+        "email_href": mailto.get("href") if mailto else None,
+        "phone": _text(phone_button),
+        "linkedin": linkedin.get("href") if linkedin else embedded_linkedin(soup),
+        "deals": parse_deal_links(soup),
+        "has_next_page": has_deal_page(soup, 2),
+        "embedded_deals": embedded_deals(soup),
+    }
+
+
+def normalize_profile_url(url: str) -> str:
+    """One key per profile: https, lower-case host and path, no query or fragment, trailing slash."""
+    parts = urlsplit(url.strip())
+    path = parts.path.lower() or "/"
+    return f"https://{parts.netloc.lower().removeprefix('www.')}{path if path.endswith('/') else path + '/'}"
+
+
+def parse_profile_links(soup: BeautifulSoup) -> List[str]:
+    urls = []
+    for btn in soup.find_all("a", string="Profile"):
+        href = btn.get('href')
+        if href and href.startswith("/agent/"):
+            urls.append(f"https://traded.co{href}")
+    return urls
+
+
+def profile_fields_from_driver(driver) -> Dict[str, Any]:
+    fields = driver.execute_script(PROFILE_JS, DEAL_LINK_SELECTOR, 2, LINKEDIN_SELECTOR)
+    if not fields["linkedin"]:
+        fields["linkedin"] = linkedin_from_embedded_data(driver.execute_script(EMBEDDED_DATA_JS, EMBEDDED_DATA_SELECTOR))
+    return fields
+
+
+def deals_from_driver(driver, next_page: int) -> Dict[str, Any]:
+    """Deals on the current page plus whether a "Go to page {next_page}" button exists."""
+    return driver.execute_script(DEALS_JS, DEAL_LINK_SELECTOR, next_page)
+
+
+def embedded_deals_from_driver(driver) -> List[Dict[str, str]]:
+    return deals_from_json_text(driver.execute_script(HYDRATION_JS, HYDRATION_SELECTOR))
+
+
+def network_deals_from_driver(driver) -> List[Dict[str, str]]:
+    """
+    Deals in the JSON XHR/fetch responses the current page has loaded, read
+    from Chrome's performance log (the driver must be started with
+    "goog:loggingPrefs" {"performance": "ALL"}) and Network.getResponseBody.
+    """
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return []
+    page_url = driver.current_url.rstrip("/")
+    page_requests, json_responses = set(), []
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        params = message.get("params", {})
+        if (message.get("method") == "Network.requestWillBeSent" and params.get("type") in ("XHR", "Fetch")
+                and (params.get("documentURL") or "").rstrip("/") == page_url):
+            page_requests.add(params.get("requestId"))
+        elif (message.get("method") == "Network.responseReceived"
+              and "json" in params.get("response", {}).get("mimeType", "")):
+            json_responses.append(params.get("requestId"))
+
+    deals = []
+    for request_id in json_responses:
+        if request_id not in page_requests:
+            continue
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            continue  # Evicted from Chrome's buffer, or the request never finished.
+        text = body.get("body")
+        if body.get("base64Encoded") and text:
+            text = base64.b64decode(text).decode("utf-8", "replace")
+        deals.extend(deals_from_json_text(text))
+    return deals
+
+
+def profile_links_from_driver(driver) -> List[str]:
+    return [f"https://traded.co{href}" for href in driver.execute_script(PROFILE_LINKS_JS)]
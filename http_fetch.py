@@ -0,0 +1,100 @@
+import os
+import threading
+import weakref
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+import pacing
+
+HTTP_FAST_PATH = os.getenv("HTTP_FAST_PATH", "0") == "1"
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+
+# Markers of a page that did not come back server-rendered and logged in.
+LOGGED_OUT_MARKER = "Sign up or log in"
+
+
+class HttpFetcher:
+    """
+    A pooled requests.Session carrying the cookies of a logged-in Selenium
+    driver, used to fetch server-rendered traded.co pages without the browser.
+    """
+
+    def __init__(self, driver):
+        self._driver_ref = weakref.ref(driver)
+        self.session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.sync_from_driver()
+
+    def sync_from_driver(self):
+        driver = self._driver_ref()
+        if driver is None:
+            return
+        self.session.cookies.clear()
+        for cookie in driver.get_cookies():
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"),
+                                     path=cookie.get("path", "/"))
+        try:
+            user_agent = driver.execute_script("return navigator.userAgent")
+        except Exception:
+            user_agent = None
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        self.session.headers.setdefault("Accept", "text/html,application/xhtml+xml")
+
+    def fetch(self, url: str, timeout: float = HTTP_TIMEOUT) -> Optional[str]:
+        """Return the page HTML, or None when the caller should fall back to the browser."""
+        driver = self._driver_ref()
+        if driver is not None:
+            pacing.pace(driver, "http")
+        try:
+            with metrics.timer("http_fetch"):
+                response = self.session.get(url, timeout=timeout)
+        except requests.RequestException as e:
+            print(f"    [HTTP] {url} failed ({e}). Falling back to browser.")
+            metrics.incr("timeouts" if isinstance(e, requests.Timeout) else "errors")
+            pacing.record("http", timeout, blocked=isinstance(e, requests.Timeout))
+            return None
+        pacing.record("http", response.elapsed.total_seconds(), blocked=response.status_code in (403, 429))
+        metrics.incr("http_pages_fetched")
+        if response.status_code != 200:
+            print(f"    [HTTP] {url} returned {response.status_code}. Falling back to browser.")
+            return None
+        html = response.text
+        if LOGGED_OUT_MARKER in html:
+            print("    [HTTP] Session cookies look stale. Re-syncing and falling back to browser.")
+            self.sync_from_driver()
+            return None
+        return html
+
+
+_fetchers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_fetchers_lock = threading.Lock()
+
+
+def get_fetcher(driver) -> Optional[HttpFetcher]:
+    """The HttpFetcher bound to `driver`, or None when the fast path is disabled."""
+    if not HTTP_FAST_PATH:
+        return None
+    with _fetchers_lock:
+        fetcher = _fetchers.get(driver)
+        if fetcher is None:
+            try:
+                fetcher = HttpFetcher(driver)
+            except Exception as e:
+                print(f"    [HTTP] Could not copy the browser session: {e}")
+                return None
+            _fetchers[driver] = fetcher
+        return fetcher
+
+
+def fetch_html(driver, url: str) -> Optional[str]:
+    fetcher = get_fetcher(driver)
+    return fetcher.fetch(url) if fetcher else None
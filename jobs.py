@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import metrics
+from export import ExportSink
+
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+JOB_HISTORY_LIMIT = int(os.getenv("JOB_HISTORY_LIMIT", "100"))
+
+QUEUED, RUNNING, COMPLETED, FAILED = "queued", "running", "completed", "failed"
+
+
+class Job:
+    """
+    A background scraping run whose per-broker results can be read while it
+    is still going. A job with an `export` sink writes its results there
+    instead and only counts them.
+    """
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.results: List[Dict[str, Any]] = []
+        self.result_count = 0
+        self.export: Optional[ExportSink] = None
+        self.stats: Optional[metrics.RunStats] = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def start(self):
+        with self._cond:
+            self.status = RUNNING
+            self.started_at = time.time()
+            self._cond.notify_all()
+
+    def add_result(self, row: Dict[str, Any]):
+        with self._cond:
+            self.result_count += 1
+            if self.export is None:
+                self.results.append(row)
+            self._cond.notify_all()
+
+    def finish(self, error: Optional[str] = None):
+        with self._cond:
+            self.status = FAILED if error else COMPLETED
+            self.error = error
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def wait_for_results(self, cursor: int, timeout: float = 1.0) -> Tuple[List[Dict[str, Any]], bool]:
+        """Block until there are results past `cursor` or the job ends; returns (new_rows, done)."""
+        with self._cond:
+            if len(self.results) <= cursor and not self.done:
+                self._cond.wait(timeout)
+            return self.results[cursor:], self.done
+
+    def timing(self) -> Optional[Dict[str, Any]]:
+        """Per-phase timings and counters of the run so far (None until it starts)."""
+        if self.stats is None:
+            return None
+        return {"phases": self.stats.timing_summary(), "counters": self.stats.summary()}
+
+    def to_dict(self, include_results: bool = True) -> Dict[str, Any]:
+        with self._cond:
+            data = {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "result_count": self.result_count,
+                "timing": self.timing(),
+                "export": self.export.describe() if self.export is not None else None,
+            }
+            if include_results:
+                data["results"] = list(self.results)
+            return data
+
+
+class JobManager:
+    """Runs scraping jobs on worker threads so the API event loop never blocks on Selenium."""
+
+    def __init__(self, max_concurrent: int = JOB_CONCURRENCY, history_limit: int = JOB_HISTORY_LIMIT):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent), thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.history_limit = history_limit
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, export: Optional[str] = None,
+               export_columns: Optional[Sequence[str]] = None, **kwargs) -> Job:
+        """
+        Queue fn(*args, on_result=job.add_result, **kwargs). The return value of fn
+        is ignored; results reach the job only through the on_result callback.
+        With an `export` format ("csv", "jsonl", "parquet") fn also gets
+        sink=<ExportSink named after the job, with `export_columns`>, closed
+        when the job ends, and the job keeps no results in memory. Raises
+        ValueError for an unusable format.
+        """
+        job = Job(kind)
+        if export:
+            job.export = kwargs["sink"] = ExportSink(export, f"{kind}-{job.id}", export_columns)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs):
+        job.start()
+        try:
+            with metrics.track_run() as job.stats:
+                fn(*args, on_result=job.add_result, **kwargs)
+        except Exception as e:
+            print(f"[Jobs] Job {job.id} failed: {e}")
+            error = str(e)
+        else:
+            error = None
+        if job.export is not None:
+            job.export.close()
+        job.finish(error=error)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        while len(self._jobs) > self.history_limit and finished:
+            self._jobs.pop(finished.pop(0), None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,155 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+DISCOVERY_JOURNAL_PATH = os.getenv("DISCOVERY_JOURNAL_PATH", os.path.join(".cache", "discovery_runs.sqlite3"))
+
+RUNNING, COMPLETED, FAILED = "running", "completed", "failed"
+
+
+class RunJournal:
+    """
+    Durable checkpoint log for discovery runs. Every listing page collected and
+    every profile extracted is written as soon as it is done, so a failed or
+    restarted run can pick up where it stopped without re-scraping anything.
+    """
+
+    def __init__(self, path: str = DISCOVERY_JOURNAL_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY, states TEXT NOT NULL, max_pages INTEGER NOT NULL,
+                    status TEXT NOT NULL, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS run_states (
+                    run_id TEXT NOT NULL, state TEXT NOT NULL, finished_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, state));
+                CREATE TABLE IF NOT EXISTS listing_pages (
+                    run_id TEXT NOT NULL, state TEXT NOT NULL, page INTEGER NOT NULL, urls TEXT NOT NULL,
+                    PRIMARY KEY (run_id, state, page));
+                CREATE TABLE IF NOT EXISTS extracted_profiles (
+                    run_id TEXT NOT NULL, state TEXT NOT NULL, profile_url TEXT NOT NULL, result TEXT NOT NULL,
+                    extracted_at REAL NOT NULL, PRIMARY KEY (run_id, state, profile_url));
+            """)
+
+    def start(self, states: List[str], max_pages: int, run_id: Optional[str] = None) -> str:
+        """Open a new run, or reopen `run_id` to resume it."""
+        now = time.time()
+        with self._lock, self._conn:
+            if run_id and self._conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone():
+                self._conn.execute("UPDATE runs SET status = ?, error = NULL, updated_at = ? WHERE run_id = ?",
+                                   (RUNNING, now, run_id))
+                return run_id
+            run_id = run_id or uuid.uuid4().hex
+            self._conn.execute(
+                "INSERT INTO runs (run_id, states, max_pages, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, json.dumps(states), max_pages, RUNNING, now, now))
+            return run_id
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, states, max_pages, status, error, created_at, updated_at FROM runs WHERE run_id = ?",
+                (run_id,)).fetchone()
+            if row is None:
+                return None
+            done = [r[0] for r in self._conn.execute("SELECT state FROM run_states WHERE run_id = ?", (run_id,))]
+            extracted = self._conn.execute("SELECT COUNT(*) FROM extracted_profiles WHERE run_id = ?",
+                                           (run_id,)).fetchone()[0]
+        return {"run_id": row[0], "states": json.loads(row[1]), "max_pages": row[2], "status": row[3],
+                "error": row[4], "created_at": row[5], "updated_at": row[6], "states_done": done,
+                "profiles_extracted": extracted}
+
+    def list_runs(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            query = "SELECT run_id FROM runs"
+            params: tuple = ()
+            if status:
+                query += " WHERE status = ?"
+                params = (status,)
+            run_ids = [row[0] for row in self._conn.execute(query + " ORDER BY created_at DESC", params)]
+        return [self.get_run(run_id) for run_id in run_ids]
+
+    def _set_status(self, run_id: str, status: str, error: Optional[str] = None):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET status = ?, error = ?, updated_at = ? WHERE run_id = ?",
+                               (status, error, time.time(), run_id))
+
+    def complete(self, run_id: str):
+        self._set_status(run_id, COMPLETED)
+
+    def fail(self, run_id: str, error: str):
+        self._set_status(run_id, FAILED, error)
+
+    def is_state_done(self, run_id: str, state: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM run_states WHERE run_id = ? AND state = ?",
+                                      (run_id, state)).fetchone() is not None
+
+    def mark_state_done(self, run_id: str, state: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO run_states (run_id, state, finished_at) VALUES (?, ?, ?)",
+                               (run_id, state, time.time()))
+
+    def listing_page(self, run_id: str, state: str, page: int) -> Optional[List[str]]:
+        """Profile URLs recorded for a listing page, or None if it has not been collected yet."""
+        with self._lock:
+            row = self._conn.execute("SELECT urls FROM listing_pages WHERE run_id = ? AND state = ? AND page = ?",
+                                     (run_id, state, page)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_listing_page(self, run_id: str, state: str, page: int, urls: List[str]):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO listing_pages (run_id, state, page, urls) VALUES (?, ?, ?, ?)",
+                               (run_id, state, page, json.dumps(urls)))
+
+    def extracted_profiles(self, run_id: str, state: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT profile_url, result FROM extracted_profiles WHERE run_id = ? AND state = ?", (run_id, state))
+            return {url: json.loads(result) for url, result in rows}
+
+    def save_profile(self, run_id: str, state: str, profile_url: str, result: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extracted_profiles (run_id, state, profile_url, result, extracted_at)"
+                " VALUES (?, ?, ?, ?, ?)", (run_id, state, profile_url, json.dumps(result), time.time()))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ListingCheckpoint:
+    """The slice of a RunJournal that collect_listing_page needs for one run: its collected listing pages."""
+
+    def __init__(self, journal: RunJournal, run_id: str):
+        self.journal = journal
+        self.run_id = run_id
+
+    def get(self, state: str, page: int) -> Optional[List[str]]:
+        return self.journal.listing_page(self.run_id, state, page)
+
+    def save(self, state: str, page: int, urls: List[str]):
+        self.journal.save_listing_page(self.run_id, state, page, urls)
+
+
+_journal: Optional[RunJournal] = None
+_journal_lock = threading.Lock()
+
+
+def get_run_journal() -> RunJournal:
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = RunJournal()
+        return _journal
@@ -1,15 +1,44 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
+
+import metrics
+from scraper import run_broker_analysis, ANALYSIS_COLUMNS, THRESHOLD_PERCENTAGE, MAX_DEALS_TO_ANALYZE
+from discovery import run_discovery_process, DISCOVERY_COLUMNS
+from driver_pool import DriverPool
+from jobs import Job, JobManager, JOB_CONCURRENCY
+from journal import get_run_journal
+from rescore import DealStoreDisabled, rescore_brokers
+from webhook import shutdown_webhook_deliverer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pool = DriverPool()
+    try:
+        pool.start()
+    except Exception as e:
+        print(f"[DriverPool] Warm-up failed, drivers will be created on demand: {e}")
+    app.state.driver_pool = pool
+    # More concurrent jobs than drivers would leave the extra ones waiting out DRIVER_CHECKOUT_TIMEOUT.
+    app.state.jobs = JobManager(max_concurrent=min(JOB_CONCURRENCY, pool.size))
+    yield
+    app.state.jobs.shutdown()
+    pool.close()
+    shutdown_webhook_deliverer()
 
-from scraper import run_broker_analysis
-from discovery import run_discovery_process
 
 app = FastAPI(
     title="Traded.co Broker Analyzer API",
     description="An API to discover and analyze real estate brokers.",
     version="1.5.0",
+    lifespan=lifespan,
 )
 
 
@@ -33,6 +62,12 @@ class BrokerOutput(BaseModel):
 class DiscoveryInput(BaseModel):
     states: List[str]
     max_pages_per_state: Optional[int] = 5
+    workers: Optional[int] = None
+    run_id: Optional[str] = None
+    qualify: bool = False
+    skip_known: bool = True
+    # Background jobs only: write results to EXPORT_DIR as they arrive instead of keeping them.
+    export: Optional[Literal["csv", "jsonl", "parquet"]] = None
 
 
 class DiscoveredBroker(BaseModel):
@@ -47,22 +82,84 @@ class DiscoveredBroker(BaseModel):
     Mobile_Phone_Number: str = Field(alias="Mobile Phone Number")
     LinkedIn_Profile: Optional[str] = Field("Not Found", alias="LinkedIn Profile")
     Traded_Link_to_Loan: Optional[str] = Field(None, alias="Traded Link to Loan (Non-Stabilized)")
+    Qualified: Optional[bool] = None
+    Good_Deal_Pct: Optional[float] = Field(None, alias="Good Deal %")
 
     class Config:
         populate_by_name = True
 
 
-@app.post("/analyze-brokers", response_model=List[BrokerOutput])
-async def analyze_brokers_endpoint(brokers: List[BrokerInput]):
-    print(f"Received API request to analyze {len(brokers)} brokers.")
+class RescoreInput(BaseModel):
+    good_keywords: Optional[List[str]] = None
+    bad_keywords: Optional[List[str]] = None
+    threshold: float = THRESHOLD_PERCENTAGE
+    max_deals: int = MAX_DEALS_TO_ANALYZE
+    profile_urls: Optional[List[str]] = None
+    qualified_only: bool = False
+
+
+class RescoredBroker(BaseModel):
+    profile_url: str
+    qualified: bool
+    good: int
+    bad: int
+    skipped: int
+    pct_good: float
+    deals: int
+    good_sample_url: str
+
+
+class RescoreOutput(BaseModel):
+    brokers: int
+    qualified: int
+    threshold: float
+    seconds: float
+    missing: List[str]
+    partial: List[str]
+    results: List[RescoredBroker]
+
+
+class JobSubmitted(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+
+
+class JobStatus(JobSubmitted):
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result_count: int
+    timing: Optional[Dict[str, Any]] = None
+    export: Optional[Dict[str, Any]] = None
+    results: List[Dict[str, Any]] = []
+
+
+def _brokers_to_dicts(brokers: List[BrokerInput]) -> List[Dict[str, str]]:
     brokers_to_process = []
     for broker in brokers:
         broker_dict = broker.dict()
         broker_dict['profile_url'] = str(broker_dict['profile_url'])
         brokers_to_process.append(broker_dict)
+    return brokers_to_process
+
+
+def _get_job(job_id: str) -> Job:
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.post("/analyze-brokers", response_model=List[BrokerOutput])
+async def analyze_brokers_endpoint(brokers: List[BrokerInput], workers: Optional[int] = None):
+    print(f"Received API request to analyze {len(brokers)} brokers.")
+    brokers_to_process = _brokers_to_dicts(brokers)
 
     try:
-        qualified_brokers = run_broker_analysis(brokers_to_process)
+        qualified_brokers = await run_in_threadpool(run_broker_analysis, brokers_to_process,
+                                                    pool=app.state.driver_pool, workers=workers)
         return qualified_brokers
     except Exception as e:
         print(f"FATAL ERROR: {e}")
@@ -72,14 +169,112 @@ async def analyze_brokers_endpoint(brokers: List[BrokerInput]):
 @app.post("/discover-brokers", response_model=List[DiscoveredBroker])
 async def discover_brokers_endpoint(input_data: DiscoveryInput):
     print(f"Received API request to discover brokers in: {input_data.states}")
+    if input_data.export:
+        raise HTTPException(status_code=400, detail="Exports are written by background jobs: "
+                                                    "use POST /jobs/discover-brokers.")
     try:
-        results = run_discovery_process(input_data.states, input_data.max_pages_per_state)
+        results = await run_in_threadpool(run_discovery_process, input_data.states, input_data.max_pages_per_state,
+                                          pool=app.state.driver_pool, workers=input_data.workers,
+                                          run_id=input_data.run_id, qualify=input_data.qualify,
+                                          skip_known=input_data.skip_known)
         return results
     except Exception as e:
         print(f"FATAL ERROR during discovery: {e}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
+@app.post("/rescore", response_model=RescoreOutput)
+async def rescore_endpoint(input_data: RescoreInput):
+    print(f"Received API request to re-score stored deals at {input_data.threshold}%.")
+    try:
+        return await run_in_threadpool(rescore_brokers, input_data.good_keywords, input_data.bad_keywords,
+                                       input_data.threshold, input_data.max_deals, input_data.profile_urls,
+                                       input_data.qualified_only)
+    except DealStoreDisabled as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.get("/discovery-runs")
+async def list_discovery_runs(status: Optional[str] = None):
+    return get_run_journal().list_runs(status)
+
+
+@app.get("/discovery-runs/{run_id}")
+async def get_discovery_run(run_id: str):
+    run = get_run_journal().get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown discovery run: {run_id}")
+    return run
+
+
+@app.post("/jobs/analyze-brokers", response_model=JobSubmitted, status_code=202)
+async def submit_analyze_job(brokers: List[BrokerInput], workers: Optional[int] = None,
+                             export: Optional[Literal["csv", "jsonl", "parquet"]] = None):
+    print(f"Received job request to analyze {len(brokers)} brokers.")
+    try:
+        job = app.state.jobs.submit("analyze-brokers", run_broker_analysis, _brokers_to_dicts(brokers),
+                                    pool=app.state.driver_pool, workers=workers, export=export,
+                                    export_columns=ANALYSIS_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.to_dict(include_results=False)
+
+
+@app.post("/jobs/discover-brokers", response_model=JobSubmitted, status_code=202)
+async def submit_discovery_job(input_data: DiscoveryInput):
+    print(f"Received job request to discover brokers in: {input_data.states}")
+    try:
+        job = app.state.jobs.submit("discover-brokers", run_discovery_process, input_data.states,
+                                    input_data.max_pages_per_state, pool=app.state.driver_pool,
+                                    workers=input_data.workers, run_id=input_data.run_id,
+                                    qualify=input_data.qualify, skip_known=input_data.skip_known,
+                                    export=input_data.export, export_columns=DISCOVERY_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.to_dict(include_results=False)
+
+
+@app.get("/jobs", response_model=List[JobSubmitted])
+async def list_jobs():
+    return [job.to_dict(include_results=False) for job in app.state.jobs.list()]
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, include_results: bool = True):
+    return _get_job(job_id).to_dict(include_results=include_results)
+
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str, format: Literal["ndjson", "sse"] = "ndjson"):
+    """Stream every result of a job (including ones produced before connecting) until it finishes."""
+    job = _get_job(job_id)
+
+    async def events():
+        cursor = 0
+        while True:
+            rows, done = await asyncio.to_thread(job.wait_for_results, cursor, 1.0)
+            cursor += len(rows)
+            for row in rows:
+                if format == "sse":
+                    yield f"event: result\ndata: {json.dumps(row)}\n\n"
+                else:
+                    yield json.dumps(row) + "\n"
+            if done and not rows:
+                break
+        status = job.to_dict(include_results=False)
+        if format == "sse":
+            yield f"event: end\ndata: {json.dumps(status)}\n\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Process-wide counters and per-phase latency histograms in the Prometheus text format."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def read_root():
     return RedirectResponse(url="/docs")
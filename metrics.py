@@ -0,0 +1,167 @@
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+METRICS_PREFIX = "traded_scraper"
+# Upper bounds (seconds) of the per-phase latency histogram buckets.
+PHASE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class RunStats:
+    """
+    Counters and per-phase timings collected over a single analysis/discovery
+    run. A run tracked inside another one (e.g. a run inside a job) also feeds
+    its parent.
+    """
+
+    def __init__(self, parent: Optional["RunStats"] = None):
+        self.parent = parent
+        self.counters: Dict[str, float] = {}
+        self.timings: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+        if self.parent is not None:
+            self.parent.incr(name, amount)
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            count, total, longest = self.timings.get(phase, (0, 0.0, 0.0))
+            self.timings[phase] = [count + 1, total + seconds, max(longest, seconds)]
+        if self.parent is not None:
+            self.parent.observe(phase, seconds)
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self.counters.get(name, 0)
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.counters)
+
+    def timing_summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-phase call count and total/average/max seconds, slowest phase (by total) first."""
+        with self._lock:
+            timings = sorted(self.timings.items(), key=lambda item: item[1][1], reverse=True)
+        return {phase: {"count": int(count), "total_seconds": round(total, 6),
+                        "avg_seconds": round(total / count, 6) if count else 0.0,
+                        "max_seconds": round(longest, 6)}
+                for phase, (count, total, longest) in timings}
+
+
+class Registry:
+    """Process-wide counters and per-phase latency histograms, rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=PHASE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(phase)
+            if histogram is None:
+                histogram = self.histograms[phase] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def render(self) -> str:
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((phase, (list(b), s, c)) for phase, (b, s, c) in self.histograms.items())
+        lines = []
+        for name, value in counters:
+            metric = f"{METRICS_PREFIX}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        if histograms:
+            metric = f"{METRICS_PREFIX}_phase_seconds"
+            lines.append(f"# HELP {metric} Wall time spent in each scraping phase.")
+            lines.append(f"# TYPE {metric} histogram")
+            for phase, (bucket_counts, total, count) in histograms:
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f'{metric}_bucket{{phase="{phase}",le="{bound:g}"}} {bucket_count}')
+                lines.append(f'{metric}_bucket{{phase="{phase}",le="+Inf"}} {count}')
+                lines.append(f'{metric}_sum{{phase="{phase}"}} {total:.6f}')
+                lines.append(f'{metric}_count{{phase="{phase}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+REGISTRY = Registry()
+
+_current_run: "contextvars.ContextVar[Optional[RunStats]]" = contextvars.ContextVar("current_run", default=None)
+
+
+@contextmanager
+def track_run():
+    """Collect counters for everything that runs in this context (see copy_context for worker threads)."""
+    stats = RunStats(parent=_current_run.get())
+    token = _current_run.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_run.reset(token)
+
+
+def current_run() -> Optional[RunStats]:
+    return _current_run.get()
+
+
+def incr(name: str, amount: float = 1):
+    REGISTRY.incr(name, amount)
+    stats = _current_run.get()
+    if stats is not None:
+        stats.incr(name, amount)
+
+
+def observe(phase: str, seconds: float):
+    REGISTRY.observe(phase, seconds)
+    stats = _current_run.get()
+    if stats is not None:
+        stats.observe(phase, seconds)
+
+
+@contextmanager
+def timer(phase: str):
+    """Time the enclosed block as one call of `phase`, whether it returns or raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(phase, time.perf_counter() - start)
+
+
+def timed(phase: str):
+    """Decorator form of timer()."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(phase):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def phase_summary(stats: RunStats, top: int = 6) -> str:
+    """One-line digest of where a run's time went, slowest phases first."""
+    timings = list(stats.timing_summary().items())[:top]
+    if not timings:
+        return "no timed phases"
+    return ", ".join(f"{phase} {t['total_seconds']:.1f}s/{t['count']}" for phase, t in timings)
@@ -0,0 +1,124 @@
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+
+import metrics
+
+# Base seconds between requests of each endpoint class, per driver. These
+# replace the fixed human_delay() sleeps (listing 2-4 s, profile 5-8 s,
+# deal pages 3-5 s) and can be tuned with PACE_<CLASS>_SECONDS.
+DEFAULT_INTERVALS = {
+    "listing": 3.0,
+    "profile": 6.0,
+    "deals_page": 3.0,
+    "http": 1.0,
+}
+INTERVALS = {name: float(os.getenv(f"PACE_{name.upper()}_SECONDS", str(seconds)))
+             for name, seconds in DEFAULT_INTERVALS.items()}
+PACE_JITTER = float(os.getenv("PACE_JITTER", "0.3"))
+PACE_BURST = int(os.getenv("PACE_BURST", "1"))
+
+# Adaptive backoff: responses slower than SLOW_SECONDS (or blocked outright)
+# stretch the interval of that class for every driver, fast ones shrink it
+# back, within [MIN_MULTIPLIER, MAX_MULTIPLIER] x the base interval.
+SLOW_SECONDS = float(os.getenv("PACE_SLOW_SECONDS", "8"))
+FAST_SECONDS = float(os.getenv("PACE_FAST_SECONDS", "2"))
+MIN_MULTIPLIER = float(os.getenv("PACE_MIN_MULTIPLIER", "0.5"))
+MAX_MULTIPLIER = float(os.getenv("PACE_MAX_MULTIPLIER", "8"))
+
+BLOCK_MARKERS = ("too many requests", "access denied", "just a moment", "attention required", "429")
+
+
+class AdaptiveBackoff:
+    """Shared per-class interval multiplier that reacts to slow or blocked responses."""
+
+    def __init__(self):
+        self._multipliers: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def multiplier(self, endpoint: str) -> float:
+        with self._lock:
+            return self._multipliers.get(endpoint, 1.0)
+
+    def record(self, endpoint: str, seconds: float, blocked: bool = False):
+        with self._lock:
+            current = self._multipliers.get(endpoint, 1.0)
+            if blocked:
+                updated = min(MAX_MULTIPLIER, current * 2)
+                print(f"    [Pacing] {endpoint} looks blocked. Slowing down (x{updated:.2f}).")
+                metrics.incr("blocked_responses")
+            elif seconds > SLOW_SECONDS:
+                updated = min(MAX_MULTIPLIER, current * 1.5)
+            elif seconds < FAST_SECONDS:
+                updated = max(MIN_MULTIPLIER, current * 0.9)
+            else:
+                updated = current
+            self._multipliers[endpoint] = updated
+
+
+BACKOFF = AdaptiveBackoff()
+
+
+class RateLimiter:
+    """Token bucket with jitter, one bucket per endpoint class."""
+
+    def __init__(self, intervals: Optional[Dict[str, float]] = None, burst: int = PACE_BURST,
+                 jitter: float = PACE_JITTER, backoff: AdaptiveBackoff = BACKOFF):
+        self.intervals = dict(intervals or INTERVALS)
+        self.burst = max(1, burst)
+        self.jitter = jitter
+        self.backoff = backoff
+        self._tokens: Dict[str, float] = {}
+        self._updated: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def interval(self, endpoint: str) -> float:
+        return self.intervals.get(endpoint, 0.0) * self.backoff.multiplier(endpoint)
+
+    def acquire(self, endpoint: str):
+        """Block until a request of this class may go out."""
+        interval = self.interval(endpoint)
+        if interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            tokens = self._tokens.get(endpoint, float(self.burst))
+            tokens = min(self.burst, tokens + (now - self._updated.get(endpoint, now)) / interval)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) * interval
+            if wait:
+                wait += random.uniform(0, self.jitter * interval)
+            # Reserve the token now; the bucket refills from the moment we are released.
+            self._tokens[endpoint] = tokens - 1 + wait / interval
+            self._updated[endpoint] = now + wait
+        if wait:
+            with metrics.timer("pacing"):
+                time.sleep(wait)
+
+
+_limiters: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(driver) -> RateLimiter:
+    """Each driver (i.e. each worker session) paces itself; backoff is shared."""
+    with _limiters_lock:
+        limiter = _limiters.get(driver)
+        if limiter is None:
+            limiter = _limiters[driver] = RateLimiter()
+        return limiter
+
+
+def pace(driver, endpoint: str):
+    limiter_for(driver).acquire(endpoint)
+
+
+def record(endpoint: str, seconds: float, blocked: bool = False):
+    BACKOFF.record(endpoint, seconds, blocked)
+
+
+def looks_blocked(title: str) -> bool:
+    title = (title or "").lower()
+    return any(marker in title for marker in BLOCK_MARKERS)
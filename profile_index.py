@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional, Set
+
+from extraction import normalize_profile_url
+
+PROFILE_INDEX_ENABLED = os.getenv("PROFILE_INDEX", "1") == "1"
+PROFILE_INDEX_PATH = os.getenv("PROFILE_INDEX_PATH", os.path.join(".cache", "profile_index.sqlite3"))
+PROFILE_REFRESH_DAYS = float(os.getenv("PROFILE_REFRESH_DAYS", "30"))
+# SQLite's default limit on bound parameters is 999.
+_LOOKUP_CHUNK = 500
+
+
+class ProfileIndex:
+    """
+    Every profile URL discovery has extracted, across states and runs, with
+    when it was last extracted. Discovery skips profiles extracted within
+    `refresh_seconds` and re-extracts older ones. Lookups go straight to a
+    WITHOUT ROWID table keyed by the normalized URL, so memory stays flat
+    however many profiles are on file.
+    """
+
+    def __init__(self, path: str = PROFILE_INDEX_PATH, refresh_seconds: float = PROFILE_REFRESH_DAYS * 86400):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                " url TEXT PRIMARY KEY, state TEXT NOT NULL, last_extracted REAL NOT NULL) WITHOUT ROWID")
+
+    def fresh(self, urls: Iterable[str]) -> Set[str]:
+        """The subset of `urls` extracted within the refresh window (returned as given, not normalized)."""
+        by_key = {normalize_profile_url(url): url for url in urls}
+        keys = list(by_key)
+        cutoff = time.time() - self.refresh_seconds
+        found = set()
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start:start + _LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT url FROM profiles WHERE url IN ({', '.join('?' * len(chunk))}) AND last_extracted >= ?",
+                    (*chunk, cutoff))
+                found.update(by_key[row[0]] for row in rows)
+        return found
+
+    def mark(self, url: str, state: str):
+        """Record that `url` was just extracted (listed under `state`)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO profiles (url, state, last_extracted) VALUES (?, ?, ?)"
+                " ON CONFLICT(url) DO UPDATE SET state = excluded.state, last_extracted = excluded.last_extracted",
+                (normalize_profile_url(url), state, time.time()))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_profile_index: Optional[ProfileIndex] = None
+_profile_index_lock = threading.Lock()
+
+
+def get_profile_index() -> Optional[ProfileIndex]:
+    """The shared ProfileIndex, or None when cross-run dedupe is disabled."""
+    global _profile_index
+    if not PROFILE_INDEX_ENABLED:
+        return None
+    with _profile_index_lock:
+        if _profile_index is None:
+            _profile_index = ProfileIndex()
+        return _profile_index
@@ -0,0 +1,70 @@
+import time
+from typing import Any, Dict, List, Optional
+
+import metrics
+from classifier import KeywordClassifier, GOOD_KEYWORDS, BAD_KEYWORDS
+from deal_store import get_deal_store
+from extraction import normalize_profile_url
+from scraper import THRESHOLD_PERCENTAGE, MAX_DEALS_TO_ANALYZE
+
+
+class DealStoreDisabled(RuntimeError):
+    pass
+
+
+def rescore_brokers(good_keywords: Optional[List[str]] = None, bad_keywords: Optional[List[str]] = None,
+                    threshold: float = THRESHOLD_PERCENTAGE, max_deals: int = MAX_DEALS_TO_ANALYZE,
+                    profile_urls: Optional[List[str]] = None, qualified_only: bool = False) -> Dict[str, Any]:
+    """
+    Re-qualify brokers from their stored deal history with different keywords
+    and/or threshold, without a browser: the histories are read in one query
+    and every deal title is classified in one scan (KeywordClassifier.score_many).
+    Covers every broker in the deal store, or only `profile_urls` (in any URL
+    form; results carry the normalized URL the store keys brokers by). Brokers
+    whose stored history is partial (an earlier analysis stopped paging once
+    its verdict was settled) are not scored, since the missing deals could
+    change a verdict at other settings; they are listed under "partial" and
+    are completed by their next analysis.
+    """
+    store = get_deal_store()
+    if store is None:
+        raise DealStoreDisabled("The deal store is disabled (DEAL_STORE=0); there are no stored deals to re-score.")
+
+    start = time.perf_counter()
+    classifier = KeywordClassifier(GOOD_KEYWORDS if good_keywords is None else good_keywords,
+                                   BAD_KEYWORDS if bad_keywords is None else bad_keywords)
+    histories = store.histories(profile_urls, limit=max_deals)
+    complete_urls = store.complete_urls()
+    partial = sorted(url for url in histories if url not in complete_urls)
+    histories = {url: deals for url, deals in histories.items() if url in complete_urls}
+    scores = classifier.score_many(list(histories.values()))
+    # Same rule as scraper.qualify_snapshot.
+    verdicts = [score["pct_good"] >= threshold and score["good"] + score["bad"] > 0 for score in scores]
+
+    results = []
+    for (profile_url, deals), score, qualified in zip(histories.items(), scores, verdicts):
+        if qualified_only and not qualified:
+            continue
+        results.append({
+            "profile_url": profile_url,
+            "qualified": qualified,
+            "good": score["good"],
+            "bad": score["bad"],
+            "skipped": score["skipped"],
+            "pct_good": round(score["pct_good"], 1),
+            "deals": len(deals),
+            "good_sample_url": score["good_sample_url"] or "",
+        })
+    seconds = time.perf_counter() - start
+    metrics.observe("rescore", seconds)
+    stored = set(histories) | set(partial)
+    missing = sorted(url for url in profile_urls or [] if normalize_profile_url(url) not in stored)
+    return {
+        "brokers": len(histories),
+        "qualified": sum(verdicts),
+        "threshold": threshold,
+        "seconds": round(seconds, 3),
+        "missing": missing,
+        "partial": partial,
+        "results": results,
+    }
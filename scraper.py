@@ -1,21 +1,35 @@
+import json
 import os
-import csv
+import threading
 import time
-import random
-from typing import List, Dict, Tuple
+from typing import Any, Callable, List, Dict, Optional, Set, Tuple
 
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium_stealth import stealth
 
+import metrics
+import pacing
+from cache import get_profile_cache
+from classifier import GOOD_KEYWORDS, BAD_KEYWORDS, QualificationTracker
+from extraction import (parse_html, parse_profile_fields, profile_fields_from_driver, deals_from_driver,
+                        embedded_deals_from_driver, network_deals_from_driver, complete_deal_list,
+                        normalize_profile_url, shows_no_deals, DEAL_LINK_SELECTOR, LINKEDIN_SELECTOR,
+                        NO_DEALS_XPATH)
+from deal_store import get_deal_store
+from driver_health import record_navigation, record_result
+from export import ExportSink
+from http_fetch import fetch_html
+from singleflight import SingleFlight
+from snapshot import ProfileSnapshot
+
 load_dotenv()
 TRADED_USERNAME = os.getenv("TRADED_USERNAME", "")
 TRADED_PASSWORD = os.getenv("TRADED_PASSWORD", "")
@@ -23,20 +37,105 @@ TRADED_PASSWORD = os.getenv("TRADED_PASSWORD", "")
 THRESHOLD_PERCENTAGE = 40
 MAX_PAGES_PER_BROKER = 5
 MAX_DEALS_TO_ANALYZE = 100
-GOOD_KEYWORDS = [
-    "bridge", "construction", "acquisition", "refinance", "refinances", "mezzanine", "mezz", "rehab", "rehabilitation",
-    "development", "lease-up", "stabilization", "value-add", "repositioning", "transitional", "gap", "interim"
+# Stop loading deal pages once the verdict is settled: "bound" (exact),
+# "confidence" (Wilson interval at EARLY_EXIT_Z) or "off".
+EARLY_EXIT = os.getenv("EARLY_EXIT", "bound")
+EARLY_EXIT_Z = float(os.getenv("EARLY_EXIT_Z", "1.96"))
+EARLY_EXIT_MIN_DEALS = int(os.getenv("EARLY_EXIT_MIN_DEALS", "10"))
+# Where a broker's deal list comes from. "dom" (default) clicks through the
+# deal pages. "embedded" reads every deal from the page's hydration JSON
+# (__NEXT_DATA__) and "network" also from the JSON XHR responses in Chrome's
+# performance log; both fall back to clicking when the JSON holds no more than
+# the first rendered page.
+DEAL_SOURCE = os.getenv("DEAL_SOURCE", "dom")
+LOGIN_PROMPT_LOCATOR = (By.XPATH, "//button[normalize-space()='Sign up or log in']")
+ABOUT_HEADING_LOCATOR = (
+    By.XPATH, "//h2[normalize-space(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'))='about']")
+# Seconds to wait for the LinkedIn link after opening the About panel. Only
+# profiles whose link is not in the initial DOM or embedded data get here,
+# and a miss is cached per profile. The panel gets at least
+# LINKEDIN_PANEL_TIMEOUT seconds after the click, however long the About
+# heading took to render.
+LINKEDIN_TIMEOUT = float(os.getenv("LINKEDIN_TIMEOUT", "2"))
+LINKEDIN_PANEL_TIMEOUT = float(os.getenv("LINKEDIN_PANEL_TIMEOUT", "1"))
+
+# "Lean" drivers run headless and skip everything the scraper never reads:
+# images, fonts, media and third-party analytics/ads, plus background Chrome
+# features. Blocking happens through CDP so the stealth setup is untouched.
+LEAN_DRIVER = os.getenv("LEAN_DRIVER", "0") == "1"
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*segment.io*", "*segment.com*", "*intercom.io*",
+    "*intercomcdn.com*", "*fullstory.com*", "*hs-scripts.com*", "*hs-analytics.net*", "*clarity.ms*",
+    "*linkedin.com/px*", "*ads.linkedin.com*", "*sentry.io*", "*mixpanel.com*", "*amplitude.com*",
 ]
-BAD_KEYWORDS = [
-    "permanent", "perm", "takeout", "fixed-rate", "amortizing", "agency", "conduit", "life company", "hud", "fannie",
-    "freddie"
+# chromedriver binary: CHROMEDRIVER_PATH when set, otherwise ChromeDriverManager's
+# answer cached in CHROMEDRIVER_CACHE_PATH, so starting a driver needs no
+# network version check until the cache is CHROMEDRIVER_CACHE_DAYS old (or the
+# cached binary no longer matches Chrome).
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", "")
+CHROMEDRIVER_CACHE_PATH = os.getenv("CHROMEDRIVER_CACHE_PATH", os.path.join(".cache", "chromedriver.json"))
+CHROMEDRIVER_CACHE_DAYS = float(os.getenv("CHROMEDRIVER_CACHE_DAYS", "7"))
+_chromedriver_lock = threading.Lock()
+_chromedriver_path: Optional[str] = None
+
+LEAN_CHROME_ARGS = [
+    "--headless=new",
+    "--blink-settings=imagesEnabled=false",
+    "--disable-extensions",
+    "--disable-gpu",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication,InterestFeedContentSuggestions",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
 ]
 
 
-def get_chrome_driver() -> webdriver.Chrome:
-    print("  Initializing headless Chrome driver...")
+def chromedriver_path(refresh: bool = False) -> str:
+    """The chromedriver binary to start, resolved over the network only when the local cache cannot answer."""
+    global _chromedriver_path
+    if CHROMEDRIVER_PATH:
+        return CHROMEDRIVER_PATH
+    with _chromedriver_lock:
+        if _chromedriver_path and not refresh:
+            return _chromedriver_path
+        if not refresh:
+            try:
+                with open(CHROMEDRIVER_CACHE_PATH) as f:
+                    cached = json.load(f)
+                if (os.access(cached["path"], os.X_OK)
+                        and time.time() - cached["resolved_at"] < CHROMEDRIVER_CACHE_DAYS * 86400):
+                    _chromedriver_path = cached["path"]
+                    return _chromedriver_path
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        with metrics.timer("chromedriver_resolve"):
+            _chromedriver_path = ChromeDriverManager().install()
+        if os.path.dirname(CHROMEDRIVER_CACHE_PATH):
+            os.makedirs(os.path.dirname(CHROMEDRIVER_CACHE_PATH), exist_ok=True)
+        with open(CHROMEDRIVER_CACHE_PATH, "w") as f:
+            json.dump({"path": _chromedriver_path, "resolved_at": time.time()}, f)
+        return _chromedriver_path
+
+
+def get_chrome_driver(lean: bool = LEAN_DRIVER) -> webdriver.Chrome:
+    print(f"  Initializing {'lean headless' if lean else 'full'} Chrome driver...")
     options = Options()
-    # options.add_argument("--headless=new") 
+    if lean:
+        for argument in LEAN_CHROME_ARGS:
+            options.add_argument(argument)
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
     options.add_argument("--start-maximized")
     options.add_argument("--window-size=1920,1080")
     options.add_argument("--no-sandbox")
@@ -44,10 +143,19 @@ def get_chrome_driver() -> webdriver.Chrome:
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_experimental_option("excludeSwitches", ["enable-automation"])
     options.add_experimental_option('useAutomationExtension', False)
+    if DEAL_SOURCE == "network":
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
     options.add_argument(
         'user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36'
     )
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    try:
+        driver = webdriver.Chrome(service=Service(chromedriver_path()), options=options)
+    except SessionNotCreatedException:
+        if CHROMEDRIVER_PATH:
+            raise
+        # Usually Chrome updated past the cached chromedriver: resolve a matching one.
+        print("  Cached chromedriver rejected. Resolving a matching one...")
+        driver = webdriver.Chrome(service=Service(chromedriver_path(refresh=True)), options=options)
     stealth(driver,
             languages=["en-US", "en"],
             vendor="Google Inc.",
@@ -55,21 +163,63 @@ def get_chrome_driver() -> webdriver.Chrome:
             webgl_vendor="Intel Inc.",
             renderer="Intel Iris OpenGL Engine",
             fix_hairline=True)
+    if lean:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+    driver.lean = lean
     print("✓ Driver initialized successfully.")
     return driver
 
 
+def page_load_timings(driver) -> Dict[str, float]:
+    """Navigation Timing for the current document, in seconds (0 where the browser has no entry)."""
+    timings = driver.execute_script("""
+        const nav = performance.getEntriesByType('navigation')[0];
+        if (!nav) { return null; }
+        return {
+            dom_content_loaded: nav.domContentLoadedEventEnd / 1000,
+            load: nav.loadEventEnd / 1000,
+            transfer_bytes: nav.transferSize,
+            resources: performance.getEntriesByType('resource').length,
+        };
+    """)
+    return timings or {"dom_content_loaded": 0.0, "load": 0.0, "transfer_bytes": 0, "resources": 0}
+
+
+def record_page_load(driver, wall_seconds: float):
+    mode = "lean" if getattr(driver, "lean", False) else "full"
+    metrics.incr(f"page_loads_{mode}")
+    metrics.incr(f"page_load_seconds_{mode}", wall_seconds)
+    try:
+        timings = page_load_timings(driver)
+    except Exception:
+        return
+    metrics.incr(f"dom_content_loaded_seconds_{mode}", timings["dom_content_loaded"])
+    metrics.incr(f"page_resources_{mode}", timings["resources"])
+
+
+def page_load_summary(stats: metrics.RunStats) -> str:
+    parts = []
+    for mode in ("lean", "full"):
+        loads = stats.get(f"page_loads_{mode}")
+        if loads:
+            parts.append(f"{mode}: {loads:.0f} loads, avg {stats.get(f'page_load_seconds_{mode}') / loads:.2f}s "
+                         f"(DOMContentLoaded {stats.get(f'dom_content_loaded_seconds_{mode}') / loads:.2f}s, "
+                         f"{stats.get(f'page_resources_{mode}') / loads:.0f} resources)")
+    return "; ".join(parts) or "no browser page loads"
+
+
+@metrics.timed("login")
 def login_to_traded(driver: webdriver.Chrome):
     print("\n[STEP 1] Logging into traded.co...")
     try:
         base_url = "https://traded.co"
         driver.get(base_url)
         wait = WebDriverWait(driver, 20)
-        login_prompt_button_locator = (By.XPATH, "//button[normalize-space()='Sign up or log in']")
+        login_prompt_button_locator = LOGIN_PROMPT_LOCATOR
         print("  Clicking 'Sign up or log in' button...")
         login_prompt_button = wait.until(EC.element_to_be_clickable(login_prompt_button_locator))
         login_prompt_button.click()
-        time.sleep(1)
         print("  Entering email...")
         email_input = wait.until(EC.visibility_of_element_located((By.NAME, "email")))
         email_input.send_keys(TRADED_USERNAME)
@@ -98,171 +248,463 @@ def login_to_traded(driver: webdriver.Chrome):
         raise
 
 
-def force_nav(driver, url, timeout=30):
+# Cookie fields WebDriver's add_cookie accepts.
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "expiry", "sameSite")
+LOCAL_STORAGE_READ_JS = "return Object.fromEntries(Object.entries(window.localStorage));"
+LOCAL_STORAGE_WRITE_JS = """
+for (const [key, value] of Object.entries(arguments[0])) { window.localStorage.setItem(key, value); }
+"""
+
+
+def capture_session(driver) -> Dict[str, Any]:
+    """The logged-in driver's cookies and traded.co localStorage, for restore_session."""
+    local_storage = {}
+    if "traded.co" in (driver.current_url or ""):
+        try:
+            local_storage = driver.execute_script(LOCAL_STORAGE_READ_JS) or {}
+        except Exception:
+            pass
+    return {"cookies": driver.get_cookies(), "local_storage": local_storage}
+
+
+@metrics.timed("session_restore")
+def restore_session(driver, cookies: List[Dict[str, Any]], local_storage: Optional[Dict[str, str]] = None,
+                    timeout: float = 15) -> bool:
+    """
+    Log a fresh driver in by replaying saved traded.co cookies (and
+    localStorage) instead of going through login_to_traded. False when the
+    session they carry is no longer valid (the login prompt is still shown).
+    """
+    if not cookies:
+        return False
     try:
-        driver.get(url)
-        WebDriverWait(driver, timeout).until(lambda d: d.execute_script("return document.readyState") == "complete")
-    except Exception:
-        driver.execute_script("window.location.href = arguments[0];", url)
+        driver.get("https://traded.co")
+        driver.delete_all_cookies()
+        for cookie in cookies:
+            try:
+                driver.add_cookie({key: value for key, value in cookie.items() if key in COOKIE_FIELDS})
+            except Exception:
+                continue  # e.g. a cookie for another domain
+        if local_storage:
+            driver.execute_script(LOCAL_STORAGE_WRITE_JS, local_storage)
+        driver.refresh()
         WebDriverWait(driver, timeout).until(lambda d: d.execute_script("return document.readyState") == "complete")
+        return not driver.find_elements(*LOGIN_PROMPT_LOCATOR)
+    except Exception as e:
+        print(f"  Session restore failed: {e}")
+        return False
+
+
+def force_nav(driver, url, timeout=30, endpoint: str = "profile"):
+    """Navigate once the `endpoint` rate limiter allows it, feeding the load time back into its backoff."""
+    pacing.pace(driver, endpoint)
+    record_navigation(driver)
+    start = time.monotonic()
+    try:
+        with metrics.timer("navigation"):
+            try:
+                driver.get(url)
+                WebDriverWait(driver, timeout).until(
+                    lambda d: d.execute_script("return document.readyState") == "complete")
+            except Exception:
+                driver.execute_script("window.location.href = arguments[0];", url)
+                WebDriverWait(driver, timeout).until(
+                    lambda d: d.execute_script("return document.readyState") == "complete")
+    except TimeoutException:
+        metrics.incr("timeouts")
+        pacing.record(endpoint, time.monotonic() - start, blocked=True)
+        raise
+    elapsed = time.monotonic() - start
+    pacing.record(endpoint, elapsed, blocked=pacing.looks_blocked(driver.title))
+    record_page_load(driver, elapsed)
+
+
+def wait_for_profile(driver, timeout: float = 10, deals_timeout: float = 3) -> bool:
+    """
+    Wait for the profile header, then briefly for the deal list to render:
+    deal links or its empty state. Returns whether it rendered; when it did
+    not, the deals read from the page may not be all of them.
+    """
+    WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
+    try:
+        WebDriverWait(driver, deals_timeout).until(
+            lambda d: d.find_elements(By.CSS_SELECTOR, DEAL_LINK_SELECTOR) or d.find_elements(By.XPATH, NO_DEALS_XPATH))
+    except TimeoutException:
+        return False
+    return True
+
+
+@metrics.timed("linkedin_about")
+def open_about_linkedin(driver, timeout: float = LINKEDIN_TIMEOUT) -> str:
+    """
+    LinkedIn URL behind the profile's About panel, within a single bounded
+    wait of `timeout`: waits for the link or the About heading to render,
+    returns the link when it is there, otherwise clicks the heading and waits
+    out the rest of `timeout`, but at least LINKEDIN_PANEL_TIMEOUT, for the
+    link (TimeoutException when it never shows up). "" when neither renders in
+    time: the profile has no About panel.
+    """
+    deadline = time.monotonic() + timeout
+    try:
+        WebDriverWait(driver, timeout).until(
+            lambda d: d.find_elements(By.CSS_SELECTOR, LINKEDIN_SELECTOR) or d.find_elements(*ABOUT_HEADING_LOCATOR))
+    except TimeoutException:
+        return ""
+    rendered = driver.find_elements(By.CSS_SELECTOR, LINKEDIN_SELECTOR)
+    if rendered:
+        return rendered[0].get_attribute("href") or ""
+    driver.execute_script("arguments[0].click();", driver.find_elements(*ABOUT_HEADING_LOCATOR)[0])
+    linkedin_element = WebDriverWait(driver, max(deadline - time.monotonic(), LINKEDIN_PANEL_TIMEOUT)).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, LINKEDIN_SELECTOR)))
+    return linkedin_element.get_attribute("href") or ""
+
+
+def reaches_known_deals(deals: List[Dict[str, str]], known_urls: Optional[Set[str]]) -> bool:
+    """Deals are listed newest first, so a page with a deal we already have ends the new ones."""
+    return bool(known_urls) and any(deal['url'] in known_urls for deal in deals)
 
 
-def human_delay(a=5, b=8):
-    time.sleep(random.uniform(a, b))
+def stop_early(tracker: Optional[QualificationTracker], pages_left: int, page_size: int) -> bool:
+    """True when `tracker` has settled the verdict, counting the deal pages that are skipped as a result."""
+    if tracker is None or pages_left <= 0 or tracker.verdict(pages_left * page_size) is None:
+        return False
+    print(f"    Verdict settled. Skipping up to {pages_left} more deal page(s).")
+    metrics.incr("early_exits")
+    metrics.incr("deal_pages_saved", pages_left)
+    return True
 
 
-def load_all_deals(driver, max_pages=10) -> List[Dict[str, str]]:
+def structured_deals(driver) -> List[Dict[str, str]]:
+    """The current profile's deals from JSON the page already loaded, per DEAL_SOURCE ([] for "dom")."""
+    if DEAL_SOURCE == "dom":
+        return []
+    deals = embedded_deals_from_driver(driver)
+    if DEAL_SOURCE == "network":
+        deals += network_deals_from_driver(driver)
+    return list({deal['url']: deal for deal in deals}.values())
+
+
+def load_all_deals(driver, max_pages=10, known_urls: Optional[Set[str]] = None,
+                   tracker: Optional[QualificationTracker] = None) -> Tuple[List[Dict[str, str]], bool]:
+    """
+    The profile's deals, paging through the deal list, and whether they were
+    read to its end (or `max_pages`, or back to `known_urls`) rather than cut
+    short by `tracker` settling the verdict or a pagination timeout.
+    """
     all_deals, seen_urls, current_page = [], set(), 1
+    complete = True
     while current_page <= max_pages:
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        links = soup.select('a[class*="MuiTypography-bBase"][href*="/deals/"]')
+        page = deals_from_driver(driver, current_page + 1)
+        links = page["deals"]
         if not links:
+            # Only the first page can be empty: a later one has just been waited for.
+            complete = complete and current_page == 1
             break
+        metrics.incr("deal_pages_loaded")
+        if current_page == 1:
+            structured = complete_deal_list(links, structured_deals(driver), page["has_next_page"])
+            if structured is not None:
+                metrics.incr("structured_deal_reads")
+                all_deals = structured
+                break
         new_deals_found = False
-        for link in links:
-            url, title = link.get("href", ""), link.get_text(strip=True)
-            if url and url not in seen_urls and len(title) > 20:
-                seen_urls.add(url)
-                all_deals.append({'title': title, 'url': url})
+        for deal in links:
+            if deal['url'] not in seen_urls:
+                seen_urls.add(deal['url'])
+                all_deals.append(deal)
                 new_deals_found = True
         if not new_deals_found and current_page > 1:
             break
+        if reaches_known_deals(links, known_urls):
+            print(f"    Reached already-known deals on page {current_page}. Stopping pagination.")
+            break
+        if tracker is not None:
+            tracker.add(links)
+            if page["has_next_page"] and stop_early(tracker, max_pages - current_page, len(links)):
+                complete = False
+                break
         current_page += 1
-        if current_page > max_pages:
+        if current_page > max_pages or not page["has_next_page"]:
             break
         try:
             next_page_button = WebDriverWait(driver, 5).until(
                 EC.element_to_be_clickable((By.XPATH, f"//button[@aria-label='Go to page {current_page}']")))
-            driver.execute_script("arguments[0].scrollIntoView(true);", next_page_button)
-            time.sleep(0.5)
-            driver.execute_script("arguments[0].click();", next_page_button)
-            time.sleep(random.uniform(3, 5))
+            pacing.pace(driver, "deals_page")
+            start = time.monotonic()
+            with metrics.timer("deal_pagination"):
+                driver.execute_script("arguments[0].scrollIntoView(true);", next_page_button)
+                driver.execute_script("arguments[0].click();", next_page_button)
+                # The deal list is re-rendered in place, emptied in between: wait until it shows different deals.
+                previous_urls = [deal['url'] for deal in links]
+                WebDriverWait(driver, 15).until(lambda d: [deal['url'] for deal in deals_from_driver(
+                    d, current_page + 1)["deals"]] not in ([], previous_urls))
+            pacing.record("deals_page", time.monotonic() - start)
         except TimeoutException:
+            metrics.incr("timeouts")
+            complete = False
             break
-    return all_deals
+    metrics.incr("deals_scraped", len(all_deals))
+    return all_deals, complete
 
 
-def analyze_broker(driver, broker: Dict[str, str]) -> Tuple[bool, str, str, Dict[str, float], str]:
-    force_nav(driver, broker["profile_url"])
-    human_delay()
-    
-    deal_data = load_all_deals(driver, max_pages=MAX_PAGES_PER_BROKER)
-    print(f"    Analyzing {len(deal_data)} deals...")
-    good = bad = skipped = 0
-    good_sample_url = None
-    for deal in deal_data[:min(MAX_DEALS_TO_ANALYZE, len(deal_data))]:
-        title, url = deal['title'].lower(), deal['url']
-        has_good = any(k in title for k in GOOD_KEYWORDS)
-        has_bad = any(k in title for k in BAD_KEYWORDS)
-        if has_good and not has_bad:
-            good += 1
-            if not good_sample_url and url:
-                good_sample_url = f"https://traded.co{url}" if url.startswith("/") else url
-        elif has_bad:
-            bad += 1
-        else:
-            skipped += 1
-    
-    categorized = good + bad
-    pct_good = (good / categorized) * 100 if categorized else 0.0
-    print(f"    Good: {good} | Bad: {bad} | Skipped: {skipped} | %Good: {pct_good:.1f}%")
+def fetch_profile_fields(driver, profile_url: str, max_pages: int, known_urls: Optional[Set[str]] = None,
+                         tracker: Optional[QualificationTracker] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch a profile over plain HTTP and parse its fields (see extraction.parse_profile_fields).
+    The hydration JSON stands in for the deal pages when it lists more deals
+    than the first page. Returns None when the fast path is off, when the
+    response is not a rendered profile (no name, or neither deals nor the
+    deal list's empty state), or when the deal list is paginated past what we
+    already know and the first page does not settle `tracker`'s verdict, i.e.
+    the browser is needed after all.
+    "deals_complete" tells whether the deals read are the whole list, as in
+    load_all_deals.
+    """
+    html = fetch_html(driver, profile_url)
+    if not html:
+        return None
+    soup = parse_html(html)
+    fields = parse_profile_fields(soup)
+    # A client-rendered shell, bot check or login page has no broker name, or no deal list either way.
+    if not fields["name"] or not (fields["deals"] or shows_no_deals(soup)):
+        print("    [HTTP] No server-rendered profile. Using browser.")
+        return None
+    structured = (complete_deal_list(fields["deals"], fields["embedded_deals"], fields["has_next_page"])
+                  if DEAL_SOURCE != "dom" else None)
+    if structured is not None:
+        metrics.incr("structured_deal_reads")
+        fields["deals"], fields["has_next_page"] = structured, False
+    if tracker is not None:
+        tracker.add(fields["deals"])
+    paginated = max_pages > 1 and fields["has_next_page"] and not reaches_known_deals(fields["deals"], known_urls)
+    if paginated and not stop_early(tracker, max_pages - 1, len(fields["deals"])):
+        print("    [HTTP] Deals are paginated. Using browser.")
+        return None
+    fields["deals_complete"] = not paginated
+    metrics.incr("deals_scraped", len(fields["deals"]))
+    return fields
 
-    job_title = "Not Found"
-    try:
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        title_element = soup.select_one("h1 + p")
-        if title_element:
-            job_title = title_element.get_text(strip=True)
-    except Exception:
-        pass
 
-    linkedin_url = ""
+def merge_deal_history(profile_url: str, deals: List[Dict[str, str]], complete: bool) -> List[Dict[str, str]]:
+    """Add freshly scraped deals to the broker's stored history and return the full history."""
+    store = get_deal_store()
+    if store is None:
+        return deals
+    new_count = store.merge(profile_url, deals, complete)
+    history = store.deals(profile_url)
+    print(f"    Deal history: {new_count} new, {len(history)} total{'' if complete else ' (partial)'}.")
+    return history
+
+
+def known_deal_urls(profile_url: str) -> Set[str]:
+    """The pagination watermark: stored deal URLs, but only when the stored history has no gaps to backfill."""
+    store = get_deal_store()
+    return store.known_urls(profile_url) if store and store.is_complete(profile_url) else set()
+
+
+# Profiles being scraped right now, by normalized URL, across every run and job in the process.
+_profile_flights = SingleFlight()
+
+
+def take_profile_snapshot(driver, profile_url: str) -> ProfileSnapshot:
+    """
+    Visit a profile once and collect everything discovery and analysis need
+    (see snapshot.ProfileSnapshot): over HTTP when possible, otherwise in the
+    browser, paginating deals until the qualification verdict is settled.
+    Fresh snapshots are served from the profile cache. A profile that another
+    run is already scraping is not visited again: the caller waits for that
+    visit and gets a copy of its snapshot. The About panel is left to
+    resolve_linkedin, for callers that report the LinkedIn URL.
+    """
+    snapshot, shared = _profile_flights.do(normalize_profile_url(profile_url),
+                                           lambda: _take_profile_snapshot(driver, profile_url))
+    if not shared:
+        return snapshot
+    print("    [Coalesced] Shared the snapshot of a visit already in progress.")
+    metrics.incr("profiles_coalesced")
+    # A copy: this caller's driver is not on the page, and LinkedIn is resolved per caller.
+    return ProfileSnapshot.from_dict(profile_url, snapshot.to_dict(), snapshot.linkedin)
+
+
+def _take_profile_snapshot(driver, profile_url: str) -> ProfileSnapshot:
+    cache = get_profile_cache()
+    cached = cache.get(profile_url, accept=lambda entry: entry.get("snapshot") is not None) if cache else None
+    if cached:
+        print("    [Cache] Using cached profile snapshot.")
+        return ProfileSnapshot.from_dict(profile_url, cached["snapshot"], cached.get("linkedin"))
+
+    known_urls = known_deal_urls(profile_url)
+    tracker = QualificationTracker(THRESHOLD_PERCENTAGE, MAX_DEALS_TO_ANALYZE, EARLY_EXIT,
+                                   z=EARLY_EXIT_Z, min_deals=EARLY_EXIT_MIN_DEALS)
+    fields = fetch_profile_fields(driver, profile_url, MAX_PAGES_PER_BROKER, known_urls, tracker)
+    on_page, deals_rendered = fields is None, True
+    if on_page:
+        force_nav(driver, profile_url)
+        deals_rendered = wait_for_profile(driver)
+        fields = profile_fields_from_driver(driver)
+        deal_data, complete = load_all_deals(driver, max_pages=MAX_PAGES_PER_BROKER, known_urls=known_urls,
+                                             tracker=tracker)
+        if not deals_rendered:
+            print("    Deal list did not render. Keeping the read as partial and out of the cache.")
+            complete = False
+    else:
+        deal_data, complete = list({deal['url']: deal for deal in fields["deals"]}.values()), fields["deals_complete"]
+
+    snapshot = ProfileSnapshot(profile_url, fields, merge_deal_history(profile_url, deal_data, complete),
+                               linkedin=fields["linkedin"] or None)
+    snapshot.on_page = on_page
+    # An early exit is cached even though its history stays partial: the skipped pages could not change the verdict.
+    if cache and deals_rendered:
+        cache.update(profile_url, snapshot=snapshot.to_dict())
+        if snapshot.linkedin:
+            cache.update(profile_url, linkedin=snapshot.linkedin)
+    return snapshot
+
+
+def resolve_linkedin(driver, snapshot: ProfileSnapshot) -> str:
+    """The snapshot's LinkedIn URL, opening the About panel unless it is already known ("" means none)."""
+    if snapshot.linkedin is not None:
+        return snapshot.linkedin
+    if not snapshot.on_page:
+        # A profile that does not load says nothing about its LinkedIn: report none, cache nothing.
+        try:
+            force_nav(driver, snapshot.url)
+            wait_for_profile(driver, deals_timeout=0)
+        except Exception as e:
+            print(f"    Could not reopen the profile for its About panel: {e}")
+            return ""
+        snapshot.on_page = True
     try:
-        wait = WebDriverWait(driver, 5)
-        about_button = wait.until(EC.element_to_be_clickable(
-            (By.XPATH, "//h2[normalize-space(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'))='about']")
-        ))
-        
-        driver.execute_script("arguments[0].click();", about_button)
-        time.sleep(2) 
-        
-        linkedin_element = wait.until(EC.presence_of_element_located(
-            (By.XPATH, "//a[contains(@href, 'linkedin.com') and contains(@aria-label, 'LinkedIn profile')]")
-        ))
-        
-        raw_href = linkedin_element.get_attribute("href")
-        if raw_href:
-            linkedin_url = raw_href
-            print(f"    LinkedIn found: {linkedin_url}")
-            
+        snapshot.linkedin = open_about_linkedin(driver)
+        print(f"    LinkedIn found: {snapshot.linkedin}" if snapshot.linkedin else "    No LinkedIn on this profile.")
     except TimeoutException:
-        print("    LinkedIn/About section not found or timed out.")
+        print("    LinkedIn link did not appear in the About panel.")
+        metrics.incr("timeouts")
+        snapshot.linkedin = ""
     except Exception as e:
         print(f"    Error extracting LinkedIn: {e}")
+        return ""
+    cache = get_profile_cache()
+    if cache:
+        cache.update(snapshot.url, linkedin=snapshot.linkedin)
+    return snapshot.linkedin
 
-    qualified = pct_good >= THRESHOLD_PERCENTAGE and categorized > 0
+
+def qualify_snapshot(snapshot: ProfileSnapshot) -> Tuple[bool, str, Dict[str, float]]:
+    """(qualified, first good deal URL, good/bad/skipped/pct_good stats) for a broker's deals."""
+    print(f"    Analyzing {len(snapshot.deals)} deals...")
+    score = snapshot.score(MAX_DEALS_TO_ANALYZE)
+    good, bad, skipped, pct_good = score["good"], score["bad"], score["skipped"], score["pct_good"]
+    print(f"    Good: {good} | Bad: {bad} | Skipped: {skipped} | %Good: {pct_good:.1f}%")
+    qualified = pct_good >= THRESHOLD_PERCENTAGE and good + bad > 0
     stats = {"good": good, "bad": bad, "skipped": skipped, "pct_good": pct_good}
-    
-    return qualified, (good_sample_url or ""), job_title, stats, linkedin_url
+    return qualified, (score["good_sample_url"] or ""), stats
+
+
+def analyze_broker(driver, broker: Dict[str, str]) -> Tuple[bool, str, str, Dict[str, float], str]:
+    snapshot = take_profile_snapshot(driver, broker["profile_url"])
+    qualified, sample_url, stats = qualify_snapshot(snapshot)
+    # The LinkedIn URL is only reported for qualified brokers, so only they are worth a trip to the About panel
+    # (one click away while the browser is still on the profile).
+    linkedin_url = resolve_linkedin(driver, snapshot) if qualified else (snapshot.linkedin or "")
+    return qualified, sample_url, snapshot.job_title, stats, linkedin_url
+
+
+def analyze_broker_row(driver, index: int, total: int, broker: Dict[str, str]) -> Optional[Dict[str, str]]:
+    print(f"[{index}/{total}] {broker['name']} ({broker['company']})")
+    print(f"  URL: {broker['profile_url']}")
+    try:
+        qualified, sample_url, job_title, stats, linkedin = analyze_broker(driver, broker)
+    except Exception as e:
+        print(f"  ❌ Error analyzing {broker['name']}: {e}\n")
+        metrics.incr("errors")
+        record_result(driver, ok=False)
+        return None
+    record_result(driver, ok=True)
 
+    if not qualified:
+        print(f"  ✗ Did not qualify ({stats['pct_good']:.1f}% < {THRESHOLD_PERCENTAGE}%)")
+        print("-" * 30)
+        return None
 
-def run_broker_analysis(brokers: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    print("  ✓ QUALIFIED")
+    print("-" * 30)
+    parts = broker["name"].split()
+    return {
+        "Name": broker["name"],
+        "FirstName": parts[0] if parts else "",
+        "LastName": parts[-1] if len(parts) > 1 else "",
+        "JobTitle": job_title.strip().removesuffix(" at"),
+        "CompanyName": broker["company"],
+        "LinkedInProfile": linkedin,
+        "TradedLinkToLoan": sample_url,
+        "TradedLinkToProfile": broker["profile_url"],
+    }
+
+
+# The keys of every analysis row (analyze_broker_row), in export column order.
+ANALYSIS_COLUMNS = ("Name", "FirstName", "LastName", "JobTitle", "CompanyName", "LinkedInProfile", "TradedLinkToLoan",
+                    "TradedLinkToProfile")
+
+
+def run_broker_analysis(brokers: List[Dict[str, str]], pool=None, workers: Optional[int] = None,
+                        on_result: Optional[Callable[[Dict[str, str]], None]] = None,
+                        sink: Optional[ExportSink] = None) -> List[Dict[str, str]]:
     """
     The main scraping logic, refactored to be a callable function.
     Accepts a list of broker data, returns a list of qualified brokers.
+    Brokers are spread over `workers` logged-in drivers checked out of `pool`
+    (a temporary pool is created when none is passed) and the qualified rows
+    are returned in input order. `on_result` is called with each qualified row
+    as soon as it is produced. With a `sink`, qualified rows are written to it
+    instead of being collected, and the returned list is empty. A fatal error
+    (e.g. no driver became available) is raised after the run is wrapped up.
     """
+    # Local import: driver_pool builds on the browser helpers in this module.
+    from driver_pool import DriverPool, map_with_drivers, SCRAPER_WORKERS
+
     print("=" * 70)
     print("STARTING NEW BROKER ANALYSIS RUN")
     print("=" * 70)
 
-    driver = None
-    qualified_rows: List[Dict[str, str]] = []
+    if not brokers:
+        print("No brokers provided in the request. Exiting run.")
+        return []
 
-    try:
-        driver = get_chrome_driver()
-        login_to_traded(driver)
+    owns_pool = pool is None
+    if owns_pool:
+        pool = DriverPool(size=workers or SCRAPER_WORKERS)
+    qualified_rows: List[Dict[str, str]] = []
 
-        if not brokers:
-            print("No brokers provided in the request. Exiting run.")
-            return []
+    def analyze(driver, i, broker):
+        row = analyze_broker_row(driver, i + 1, len(brokers), broker)
+        if row and sink is not None:
+            sink.write(row)
+        if row and on_result:
+            on_result(row)
+        return row if sink is None else None
 
-        print(f"\n[STEP 2] Analyzing {len(brokers)} broker profiles provided by API request…\n")
-        for i, broker in enumerate(brokers, 1):
-            print(f"[{i}/{len(brokers)}] {broker['name']} ({broker['company']})")
-            print(f"  URL: {broker['profile_url']}")
+    with metrics.track_run() as run_stats:
+        try:
+            print(f"\n[STEP 2] Analyzing {len(brokers)} broker profiles provided by API request…\n")
+            rows = map_with_drivers(pool, brokers, analyze, workers=workers)
+            qualified_rows = [row for row in rows if row]
 
-            try:
-                qualified, sample_url, job_title, stats, linkedin = analyze_broker(driver, broker)
-                if qualified:
-                    print("  ✓ QUALIFIED")
-                    parts = broker["name"].split()
-
-                    qualified_rows.append({
-                        "Name": broker["name"],
-                        "FirstName": parts[0] if parts else "",
-                        "LastName": parts[-1] if len(parts) > 1 else "",
-                        "JobTitle": job_title.strip().removesuffix(" at"),
-                        "CompanyName": broker["company"],
-                        "LinkedInProfile": linkedin,
-                        "TradedLinkToLoan": sample_url,
-                        "TradedLinkToProfile": broker["profile_url"],
-                    })
-                else:
-                    print(f"  ✗ Did not qualify ({stats['pct_good']:.1f}% < {THRESHOLD_PERCENTAGE}%)")
-                print("-" * 30)
-                if i < len(brokers):
-                    human_delay(8, 12)
-            except Exception as e:
-                print(f"  ❌ Error analyzing {broker['name']}: {e}\n")
-                continue
+        except Exception as e:
+            print(f"\nAn unexpected fatal error occurred: {e}")
+            raise
+        finally:
+            print("\n" + "=" * 70)
+            if owns_pool:
+                print("ANALYSIS RUN FINISHED. Closing drivers.")
+                pool.close()
+            else:
+                print("ANALYSIS RUN FINISHED. Returning drivers to pool.")
+            print(f"Profile cache: {run_stats.get('cache_hits'):.0f} hits / {run_stats.get('cache_misses'):.0f} misses")
+            print(f"Page loads: {page_load_summary(run_stats)}")
+            print(f"Early exit ({EARLY_EXIT}): {run_stats.get('early_exits'):.0f} brokers settled early, "
+                  f"up to {run_stats.get('deal_pages_saved'):.0f} deal page loads saved")
+            print(f"Phase time: {metrics.phase_summary(run_stats)}")
+            print("=" * 70)
 
-    except Exception as e:
-        print(f"\nAn unexpected fatal error occurred: {e}")
-    finally:
-        print("\n" + "=" * 70)
-        print("ANALYSIS RUN FINISHED. Closing driver.")
-        if driver:
-            driver.quit()
-        print("=" * 70)
-
-    return qualified_rows
\ No newline at end of file
+    return qualified_rows
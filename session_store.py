@@ -0,0 +1,94 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+SESSION_STORE_ENABLED = os.getenv("SESSION_STORE", "1") == "1"
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", os.path.join(".cache", "session.bin"))
+SESSION_MAX_AGE_HOURS = float(os.getenv("SESSION_MAX_AGE_HOURS", "24"))
+_SALT_BYTES = 16
+
+
+class SessionStore:
+    """
+    The traded.co session (cookies and localStorage) of a logged-in driver,
+    kept in a Fernet-encrypted file so a cold start can skip the login form.
+    The key is derived with scrypt from `secret` (SESSION_SECRET, or the
+    account password) and a random per-file salt. A saved session is used
+    until it is `max_age` seconds old or all of its cookies have expired
+    (expired ones are dropped). Anything unreadable (wrong secret, corrupt
+    file) counts as no session.
+    """
+
+    def __init__(self, secret: str, path: str = SESSION_STORE_PATH, max_age: float = SESSION_MAX_AGE_HOURS * 3600):
+        self.secret = secret.encode()
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _fernet(self, salt: bytes) -> "Fernet":
+        key = hashlib.scrypt(self.secret, salt=salt, n=2 ** 14, r=8, p=1, dklen=32)
+        return Fernet(base64.urlsafe_b64encode(key))
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """{"cookies": [...], "local_storage": {...}, "saved_at": ...} or None when there is no usable session."""
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    blob = f.read()
+                session = json.loads(self._fernet(blob[:_SALT_BYTES]).decrypt(blob[_SALT_BYTES:]))
+            except (OSError, ValueError, InvalidToken):
+                return None
+        now = time.time()
+        if now - session.get("saved_at", 0) > self.max_age:
+            return None
+        cookies = [cookie for cookie in session.get("cookies", []) if cookie.get("expiry", now + 1) > now]
+        if not cookies:
+            return None
+        session["cookies"] = cookies
+        return session
+
+    def save(self, cookies: List[Dict[str, Any]], local_storage: Optional[Dict[str, str]] = None):
+        salt = os.urandom(_SALT_BYTES)
+        payload = json.dumps({"cookies": cookies, "local_storage": local_storage or {}, "saved_at": time.time()})
+        blob = salt + self._fernet(salt).encrypt(payload.encode())
+        with self._lock:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, self.path)
+
+    def clear(self):
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+_session_store: Optional[SessionStore] = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> Optional[SessionStore]:
+    """The shared SessionStore, or None when it is disabled, cryptography is missing or there is no secret."""
+    global _session_store
+    if not SESSION_STORE_ENABLED or Fernet is None:
+        return None
+    secret = os.getenv("SESSION_SECRET") or os.getenv("TRADED_PASSWORD", "")
+    if not secret:
+        return None
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = SessionStore(secret)
+        return _session_store
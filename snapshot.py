@@ -0,0 +1,86 @@
+from typing import Any, Dict, List, Optional
+
+from classifier import KeywordClassifier, DEFAULT_CLASSIFIER
+
+# Header and contact fields kept from extraction.parse_profile_fields / PROFILE_JS.
+PROFILE_FIELDS = ("name", "headline", "position_text", "position_company", "caption_company", "caption_text",
+                  "email_href", "phone")
+
+
+class ProfileSnapshot:
+    """
+    Everything the scraper reads from one broker profile in a single visit:
+    header and contact fields, the deal list (merged with the stored history)
+    and the LinkedIn URL. Discovery rows and qualification verdicts are both
+    derived from it, so a broker that is discovered and then analyzed is only
+    scraped once.
+
+    `linkedin` is None until the About panel has been checked and "" when the
+    profile has no LinkedIn link. `on_page` is True while the driver that took
+    the snapshot is still showing the profile.
+    """
+
+    def __init__(self, url: str, fields: Dict[str, Any], deals: List[Dict[str, str]],
+                 linkedin: Optional[str] = None):
+        self.url = url
+        self.fields = {name: fields.get(name) for name in PROFILE_FIELDS}
+        self.deals = deals
+        self.linkedin = linkedin
+        self.on_page = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Cacheable form. The LinkedIn URL is cached under its own key: it is often resolved after the snapshot."""
+        return {"fields": self.fields, "deals": self.deals}
+
+    @classmethod
+    def from_dict(cls, url: str, data: Dict[str, Any], linkedin: Optional[str] = None) -> "ProfileSnapshot":
+        return cls(url, data["fields"], data["deals"], linkedin)
+
+    @property
+    def job_title(self) -> str:
+        return self.fields["headline"] or "Not Found"
+
+    def score(self, max_deals: int, classifier: KeywordClassifier = DEFAULT_CLASSIFIER) -> Dict:
+        return classifier.score_deals(self.deals[:max_deals])
+
+    def metadata(self, classifier: KeywordClassifier = DEFAULT_CLASSIFIER) -> Dict[str, str]:
+        """The discovery row for this broker."""
+        fields = self.fields
+        name, first_name, last_name = "Unknown", "", ""
+        if fields["name"] is not None:
+            name = fields["name"]
+            parts = name.split()
+            if parts:
+                first_name = parts[0]
+                if len(parts) > 1:
+                    last_name = parts[-1]
+
+        company = "Unknown"
+        job_title = "Unknown"
+        if fields["position_text"] is not None:
+            if fields["position_company"] is not None:
+                company = fields["position_company"]
+            full_text = fields["position_text"]
+            if company != "Unknown":
+                temp_title = full_text.replace(company, "").strip()
+                job_title = temp_title[:-3].strip() if temp_title.lower().endswith(" at") else temp_title
+        elif fields["caption_company"] is not None:
+            company = fields["caption_company"]
+            job_title = fields["caption_text"].replace(company, "").strip().removesuffix(" at").strip()
+
+        email = ""
+        if fields["email_href"]:
+            email = fields["email_href"].replace("mailto:", "").split("?")[0]
+
+        return {
+            "Name": name,
+            "First Name": first_name,
+            "Last Name": last_name,
+            "Traded Link to Profile": self.url,
+            "Company": company,
+            "Job Title": job_title,
+            "Business Email": email,
+            "Mobile Phone Number": fields["phone"] if fields["phone"] is not None else "Not Found",
+            "LinkedIn Profile": self.linkedin or "",
+            "Traded Link to Loan (Non-Stabilized)": classifier.first_good_deal_url(self.deals),
+        }
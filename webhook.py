@@ -0,0 +1,222 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "https://n8n.globbizenterprises.com/webhook/scraper-webhook")
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "15"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+WEBHOOK_FLUSH_SECONDS = float(os.getenv("WEBHOOK_FLUSH_SECONDS", "10"))
+WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", "5"))
+WEBHOOK_BACKOFF_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_SECONDS", "1"))
+WEBHOOK_MAX_BACKOFF_SECONDS = float(os.getenv("WEBHOOK_MAX_BACKOFF_SECONDS", "60"))
+WEBHOOK_SPOOL_DIR = os.getenv("WEBHOOK_SPOOL_DIR", os.path.join(".cache", "webhook_spool"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000"))
+
+_FLUSH, _STOP = "flush", "stop"
+
+
+class WebhookDeliverer:
+    """
+    Background delivery of broker rows to the n8n webhook.
+
+    enqueue() never blocks the scrape loop. A worker thread groups rows per
+    state into batches of up to `batch_size` (or whatever arrived within
+    `flush_seconds`), posts each batch over a pooled session with timeouts and
+    retries with exponential backoff. Batches that still fail are spooled to
+    `spool_dir` as JSON files and re-sent once the endpoint answers again;
+    unreadable spool files are moved aside as `*.json.bad`. An error in one
+    round of delivery is logged and never stops the worker thread.
+    """
+
+    def __init__(self, url: str = WEBHOOK_URL, timeout: float = WEBHOOK_TIMEOUT,
+                 batch_size: int = WEBHOOK_BATCH_SIZE, flush_seconds: float = WEBHOOK_FLUSH_SECONDS,
+                 max_retries: int = WEBHOOK_MAX_RETRIES, backoff: float = WEBHOOK_BACKOFF_SECONDS,
+                 spool_dir: str = WEBHOOK_SPOOL_DIR, queue_size: int = WEBHOOK_QUEUE_SIZE):
+        self.url = url
+        self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.spool_dir = spool_dir
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._pending_since: Dict[str, float] = {}
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="webhook-delivery", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, rows: List[Dict[str, Any]], state: str):
+        if not rows:
+            return
+        self._idle.clear()
+        try:
+            self._queue.put_nowait((state, list(rows)))
+        except queue.Full:
+            print(f"  [Webhook] Delivery queue full. Spooling {len(rows)} results for {state} to disk.")
+            self._spool({"state": state, "count": len(rows), "brokers": list(rows)})
+
+    def _run(self):
+        last_spool_check = 0.0
+        while True:
+            try:
+                item = self._queue.get(timeout=self._next_deadline())
+            except queue.Empty:
+                item = None
+            try:
+                if item == _STOP:
+                    self._flush(force=True)
+                    return
+                if isinstance(item, tuple):
+                    state, rows = item
+                    if state not in self._pending:
+                        self._pending[state] = []
+                        self._pending_since[state] = time.monotonic()
+                    self._pending[state].extend(rows)
+                self._flush(force=item == _FLUSH)
+                if time.monotonic() - last_spool_check > self.flush_seconds:
+                    last_spool_check = time.monotonic()
+                    self._resend_spool()
+            except Exception as e:
+                print(f"  ✗ Webhook delivery error: {e}")
+                metrics.incr("webhook_errors")
+            if self._queue.empty() and not self._pending:
+                self._idle.set()
+
+    def _next_deadline(self) -> float:
+        if not self._pending:
+            return self.flush_seconds
+        oldest = min(self._pending_since.values())
+        return max(0.05, self.flush_seconds - (time.monotonic() - oldest))
+
+    def _flush(self, force: bool):
+        now = time.monotonic()
+        for state in list(self._pending):
+            rows = self._pending[state]
+            while len(rows) >= self.batch_size:
+                self._deliver(state, rows[:self.batch_size])
+                rows = rows[self.batch_size:]
+            if rows and (force or now - self._pending_since[state] >= self.flush_seconds):
+                self._deliver(state, rows)
+                rows = []
+            if rows:
+                self._pending[state] = rows
+            else:
+                del self._pending[state]
+                del self._pending_since[state]
+
+    def _post(self, payload: Dict[str, Any]) -> bool:
+        delay = self.backoff
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+                if 200 <= response.status_code < 300:
+                    return True
+                print(f"  ✗ Webhook failed with status: {response.status_code} (attempt {attempt})")
+                if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+                    return False
+            except requests.RequestException as e:
+                print(f"  ✗ Webhook error: {e} (attempt {attempt})")
+            if attempt < self.max_retries and not self._stopping:
+                time.sleep(delay)
+                delay = min(delay * 2, WEBHOOK_MAX_BACKOFF_SECONDS)
+        return False
+
+    def _deliver(self, state: str, rows: List[Dict[str, Any]]):
+        payload = {"state": state, "count": len(rows), "brokers": rows}
+        print(f"  [Webhook] Sending {len(rows)} results for {state} to n8n...")
+        with metrics.timer("webhook"):
+            delivered = self._post(payload)
+        if delivered:
+            metrics.incr("webhook_batches_sent")
+            print("  ✓ Webhook sent successfully.")
+        else:
+            metrics.incr("webhook_batches_spooled")
+            self._spool(payload)
+
+    def _spool(self, payload: Dict[str, Any]):
+        path = os.path.join(self.spool_dir, f"{time.time():.6f}-{uuid.uuid4().hex}.json")
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            with open(path + ".tmp", "w") as f:
+                json.dump(payload, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"  ❌ [Webhook] Could not spool {payload['count']} results for {payload['state']}: {e}. "
+                  f"They are lost.")
+            metrics.incr("webhook_batches_dropped")
+            return
+        print(f"  [Webhook] Spooled {payload['count']} results for {payload['state']} to {path}.")
+
+    def _resend_spool(self):
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "*.json"))):
+            try:
+                with open(path) as f:
+                    payload = json.load(f)
+                if not isinstance(payload, dict) or not {"state", "count", "brokers"} <= set(payload):
+                    raise ValueError("not a spooled batch")
+            except (OSError, ValueError) as e:
+                print(f"  ✗ Unreadable spooled webhook batch {path} ({e}). Moving it aside.")
+                os.replace(path, path + ".bad")
+                continue
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.RequestException:
+                return
+            if not 200 <= response.status_code < 300:
+                return
+            print(f"  ✓ Re-sent spooled webhook batch for {payload['state']} ({payload['count']} results).")
+            os.remove(path)
+
+    def spooled_count(self) -> int:
+        return len(glob.glob(os.path.join(self.spool_dir, "*.json")))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything enqueued so far has been delivered or spooled."""
+        self._idle.clear()
+        self._queue.put(_FLUSH)
+        return self._idle.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 30):
+        self._stopping = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self.session.close()
+
+
+_deliverer: Optional[WebhookDeliverer] = None
+_deliverer_lock = threading.Lock()
+
+
+def get_webhook_deliverer() -> WebhookDeliverer:
+    global _deliverer
+    with _deliverer_lock:
+        if _deliverer is None:
+            _deliverer = WebhookDeliverer()
+            atexit.register(_deliverer.close)
+        return _deliverer
+
+
+def shutdown_webhook_deliverer(timeout: Optional[float] = 30):
+    global _deliverer
+    with _deliverer_lock:
+        deliverer, _deliverer = _deliverer, None
+    if deliverer is not None:
+        deliverer.close(timeout)